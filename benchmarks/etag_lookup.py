@@ -0,0 +1,72 @@
+"""
+Micro-benchmark of the stored etag lookup done for every fetched plugin:
+list scan (old) against the ID index of get_etags_by_plugins.
+
+    python benchmarks/etag_lookup.py [sizes...]
+
+The list scan is quadratic, so above SAMPLE plugins it is timed on a sample
+of lookups and extrapolated to the full run.
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import pandas as pd  # noqa: E402
+
+from database.search import get_etags_by_plugins  # noqa: E402
+from interface import EtagPlugins  # noqa: E402
+
+SAMPLE = 2000
+
+
+def seatable_frame(size: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "_id": [f"row-{i}" for i in range(size)],
+            "ID": [f"plugin-{i}" for i in range(size)],
+            "ETAG": [f'"etag-{i}"' for i in range(size)],
+            "Last Commit Date": ["2024-01-01"] * size,
+        }
+    )
+
+
+def list_scan(db: pd.DataFrame, ids: list[str]) -> float:
+    start = timeit.default_timer()
+    etags = [
+        EtagPlugins(
+            etag=row["ETAG"], plugin_id=row["ID"], commit_date=row["Last Commit Date"]
+        )
+        for row in db.to_dict("records")
+    ]
+    build = timeit.default_timer() - start
+    sample = ids[:SAMPLE]
+    start = timeit.default_timer()
+    for plugin_id in sample:
+        [x for x in etags if x.plugin_id == plugin_id]
+    lookups = timeit.default_timer() - start
+    return build + lookups * len(ids) / len(sample)
+
+
+def indexed(db: pd.DataFrame, ids: list[str]) -> float:
+    start = timeit.default_timer()
+    etags = get_etags_by_plugins(db)
+    for plugin_id in ids:
+        etags.get(plugin_id)
+    return timeit.default_timer() - start
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'plugins':>8} {'list scan (s)':>14} {'index (s)':>10} {'speedup':>8}")
+    for size in sizes:
+        db = seatable_frame(size)
+        ids = db["ID"].tolist()
+        old = list_scan(db, ids)
+        new = indexed(db, ids)
+        print(f"{size:>8} {old:>14.3f} {new:>10.4f} {old / new:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [2000, 20000])
@@ -0,0 +1,149 @@
+"""
+Synthetic fixtures shaped like the recorded responses the pipeline consumes:
+community-plugins.json, manifests, commits, and the SeaTable query results of
+the Plugins and "Keywords to Category" tables. They are seeded, so a scale
+always produces the same data and results stay comparable between runs.
+
+    python benchmarks/fixtures.py SCALE DIR   # record them as JSON files
+"""
+
+import json
+import random
+import sys
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import pandas as pd  # noqa: E402
+
+from database.automatic_category import KeywordMatcher  # noqa: E402
+from interface import PluginItems  # noqa: E402
+from utils import ACTIVE_DAYS  # noqa: E402
+
+WORDS = (
+    "note task calendar graph markdown sync git daily template table link tag "
+    "image pdf canvas kanban editor theme search vim outline citation latex "
+    "diagram mermaid timer focus habit journal backup export publish format"
+).split()
+CATEGORIES = 40
+KEYWORDS = 200
+DELETED = 0.01  # rows of the database no longer in the community list
+NEW = 0.01  # community plugins not in the database yet
+CHANGED = 0.05  # plugins with a field to update
+DUPLICATED = 0.002
+
+
+@dataclass
+class Fixtures:
+    scale: int
+    registry: list[dict[str, Any]] = field(default_factory=list)
+    manifests: dict[str, dict[str, Any]] = field(default_factory=dict)
+    branches: dict[str, str] = field(default_factory=dict)
+    commits: dict[str, dict[str, Any]] = field(default_factory=dict)
+    plugins_rows: list[dict[str, Any]] = field(default_factory=list)
+    keywords_rows: list[dict[str, Any]] = field(default_factory=list)
+
+    def record(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, value in vars(self).items():
+            if name != "scale":
+                (directory / f"{name}.json").write_text(json.dumps(value))
+
+    @classmethod
+    def replay(cls, directory: Path) -> "Fixtures":
+        values = {
+            path.stem: json.loads(path.read_text()) for path in directory.glob("*.json")
+        }
+        return cls(scale=len(values["registry"]), **values)
+
+
+def build(scale: int, seed: int = 0) -> Fixtures:  # noqa
+    rng = random.Random(seed)
+    today = date.today()
+    fixtures = Fixtures(scale=scale)
+    categories = [
+        {"row_id": f"cat-{i}", "display_value": f"Category {i}"}
+        for i in range(CATEGORIES)
+    ]
+    for i in range(KEYWORDS):
+        fixtures.keywords_rows.append(
+            {
+                "_id": f"kw-{i}",
+                "_mtime": "2024-01-01T00:00:00+00:00",
+                "Keyword": WORDS[i % len(WORDS)] if i < len(WORDS) else f"word{i}",
+                "Category Record": rng.sample(categories, rng.randint(1, 2)),
+            }
+        )
+    matcher = KeywordMatcher(pd.DataFrame(fixtures.keywords_rows))
+    for i in range(scale):
+        plugin_id = f"plugin-{i}"
+        author = f"author-{i % (scale // 4 + 1)}"
+        repo = f"{author}/obsidian-{plugin_id}"
+        description = " ".join(rng.sample(WORDS, 6))
+        commit_date = today - timedelta(days=rng.randint(0, 900))
+        etag = f'"{rng.getrandbits(64):016x}"'
+        funding = f"https://ko-fi.com/{author}" if i % 4 == 0 else None
+        desktop_only = i % 3 == 0
+        fixtures.registry.append(
+            {
+                "id": plugin_id,
+                "name": f"Plugin {i} {WORDS[i % len(WORDS)]}",
+                "author": author,
+                "description": description,
+                "repo": repo,
+            }
+        )
+        fixtures.manifests[repo] = {
+            "id": plugin_id,
+            "name": f"Plugin {i}",
+            "version": "1.0.0",
+            "description": description,
+            "author": author,
+            "fundingUrl": funding,
+            "isDesktopOnly": desktop_only,
+        }
+        fixtures.branches[repo] = "master" if i % 5 else "main"
+        fixtures.commits[repo] = {
+            "etag": etag,
+            "date": f"{commit_date.isoformat()}T12:00:00Z",
+        }
+        if rng.random() < NEW:
+            continue
+        categories = matcher.match(PluginItems(**fixtures.registry[-1]))
+        changed = rng.random() < CHANGED
+        row = {
+            "_id": f"row-{i}",
+            "_mtime": "2024-01-01T00:00:00+00:00",
+            "ID": plugin_id,
+            "Name": f"Plugin {i} {WORDS[i % len(WORDS)]}",
+            "Author": author,
+            "Description": description if not changed else "outdated",
+            "Funding URL": funding,
+            "Mobile friendly": True if not desktop_only else None,
+            "Last Commit Date": commit_date.isoformat(),
+            "ETAG": etag,
+            "Status": "ACTIVE" if (today - commit_date).days < ACTIVE_DAYS else "STALE",
+            "Error": None,
+            "Github Link": f"https://github.com/{repo}",
+            "Auto-Suggested Categories": categories if not changed else [],
+        }
+        fixtures.plugins_rows.append(row)
+        if rng.random() < DUPLICATED:
+            fixtures.plugins_rows.append({**row, "_id": f"row-{i}-dup"})
+    for i in range(int(scale * DELETED)):
+        fixtures.plugins_rows.append(
+            {
+                "_id": f"row-gone-{i}",
+                "ID": f"gone-{i}",
+                "Name": f"Gone {i}",
+                "Github Link": f"https://github.com/gone/gone-{i}",
+            }
+        )
+    return fixtures
+
+
+if __name__ == "__main__":
+    build(int(sys.argv[1])).record(Path(sys.argv[2]))
@@ -0,0 +1,80 @@
+"""
+Benchmark of the plugins snapshot: the old indented plugins.json (json.load
+then PluginItems(**x) per entry, regex pass on save) against the JSONL
+snapshot validated in one TypeAdapter call.
+
+    python benchmarks/snapshot_load.py [sizes...]
+"""
+
+import json
+import re
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from interface import PluginItems  # noqa: E402
+from snapshot import read_plugins, write_plugins  # noqa: E402
+
+
+def plugins(size: int) -> list[PluginItems]:
+    return [
+        PluginItems(
+            id=f"plugin-{i}",
+            name=f"Plugin {i}",
+            author=f"author-{i % 500}",
+            description=f"Does thing number {i} in the vault, quickly.",
+            repo=f"author-{i % 500}/plugin-{i}",
+            fundingUrl="https://example.com/fund" if i % 3 == 0 else "",
+            isDesktopOnly=bool(i % 2),
+            last_commit_date="2024-01-01",
+            etag=f'"etag-{i}"',
+            fetched_at=1.7e9 + i,
+        )
+        for i in range(size)
+    ]
+
+
+def save_legacy(data: list[PluginItems], path: Path) -> None:
+    plugins_json = json.dumps(
+        [x.model_dump() for x in data], ensure_ascii=False, indent=4
+    )
+    plugins_json = re.sub(
+        r"\"etag\": \"\\\"(.*)\\\"\",", '"etag": "\\1",', plugins_json
+    )
+    path.write_text(plugins_json, encoding="utf-8")
+
+
+def load_legacy(path: Path) -> list[PluginItems]:
+    with path.open("r", encoding="utf-8") as f:
+        return [PluginItems(**x) for x in json.load(f)]
+
+
+def best(func: object, repeat: int = 3) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))  # type: ignore
+
+
+def main(sizes: list[int]) -> None:
+    print(
+        f"{'plugins':>8} {'old save (s)':>13} {'jsonl save (s)':>15}"
+        f" {'old load (s)':>13} {'jsonl load (s)':>15} {'speedup':>8}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy, jsonl = Path(tmp) / "plugins.json", Path(tmp) / "plugins.jsonl"
+        for size in sizes:
+            data = plugins(size)
+            old_save = best(lambda: save_legacy(data, legacy))
+            new_save = best(lambda: write_plugins(data, jsonl))
+            old_load = best(lambda: load_legacy(legacy))
+            new_load = best(lambda: read_plugins(jsonl))
+            assert read_plugins(jsonl) == data
+            print(
+                f"{size:>8} {old_save:>13.3f} {new_save:>15.3f}"
+                f" {old_load:>13.3f} {new_load:>15.3f} {old_load / new_load:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [2000, 50000])
@@ -0,0 +1,206 @@
+"""
+Local stand-ins for GitHub and SeaTable, serving the benchmark fixtures.
+
+GitHub is a real HTTP server on localhost: the shared session of
+http_client gets an adapter that rewrites https://<host>/<path> to
+http://127.0.0.1:<port>/<host>/<path>, so the code under test runs its
+usual requests, cache and rate limiter. SeaTable is replayed in process.
+"""
+
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import urlsplit
+
+from fixtures import Fixtures
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from seatable_api import Base
+
+RATE_LIMIT_HEADERS = {
+    "X-RateLimit-Limit": "1000000",
+    "X-RateLimit-Remaining": "999999",
+    "X-RateLimit-Reset": "4102444800",
+}
+
+
+class GitHubStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fixtures: Fixtures) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.fixtures = fixtures
+        self.registry = json.dumps(fixtures.registry).encode()
+        self.requests: Counter[str] = Counter()
+        self.archived: set[str] = set()  # repositories answered as archived
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, kind: str) -> None:
+        with self.lock:
+            self.requests[kind] += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: GitHubStub
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # noqa: N802
+        host, _, path = self.path.lstrip("/").partition("/")
+        parts = path.split("/")
+        fixtures = self.server.fixtures
+        if path.endswith("community-plugins.json"):
+            self.server.count("registry")
+            self._reply(self.server.registry, '"registry"')
+        elif host == "raw.githubusercontent.com" and path.endswith("manifest.json"):
+            self.server.count("manifest")
+            repo, branch = "/".join(parts[:2]), parts[2]
+            if fixtures.branches.get(repo) != branch:
+                self._reply(None, status=404)
+            else:
+                body = json.dumps(fixtures.manifests[repo]).encode()
+                self._reply(body, f'"{repo}@{branch}"')
+        elif host == "api.github.com" and path.endswith("/commits"):
+            self.server.count("commits")
+            commit = fixtures.commits["/".join(parts[1:3])]
+            body = json.dumps(
+                [{"commit": {"author": {"date": commit["date"]}}}]
+            ).encode()
+            self._reply(body, commit["etag"], RATE_LIMIT_HEADERS)
+        elif host == "api.github.com" and len(parts) == 3:  # noqa: PLR2004
+            self.server.count("repository")
+            repo = "/".join(parts[1:3])
+            commit = fixtures.commits[repo]
+            body = json.dumps({"archived": repo in self.server.archived}).encode()
+            self._reply(body, commit["etag"], RATE_LIMIT_HEADERS)
+        else:
+            self._reply(None, status=404)
+
+    def do_POST(self) -> None:  # noqa: N802
+        """GraphQL: one aliased `repository` node per owner/name variable pair."""
+        if self.path != "/api.github.com/graphql":
+            self._reply(None, status=404)
+            return
+        self.server.count("graphql")
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        variables = payload["variables"]
+        data: dict[str, Any] = {}
+        for key, owner in variables.items():
+            if not key.startswith("o"):
+                continue
+            alias = f"r{key[1:]}"
+            repo = f"{owner}/{variables[f'n{key[1:]}']}"
+            commit = self.server.fixtures.commits.get(repo)
+            # unknown repositories resolve to null, as on GitHub
+            data[alias] = commit and {
+                "isArchived": repo in self.server.archived,
+                "isDisabled": False,
+                "pushedAt": commit["date"],
+                "defaultBranchRef": {"target": {"authoredDate": commit["date"]}},
+            }
+        body = json.dumps({"data": data}).encode()
+        self._reply(body, headers=RATE_LIMIT_HEADERS)
+
+    def _reply(
+        self,
+        body: bytes | None,
+        etag: str | None = None,
+        headers: dict[str, str] | None = None,
+        status: int = 200,
+    ) -> None:
+        if etag and self.headers.get("If-None-Match") in (etag, f"W/{etag}"):
+            status, body = 304, None
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body or b"")))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:  # noqa: ANN401
+        pass
+
+
+class RewriteAdapter(HTTPAdapter):
+    """Send every https request of the session to the stub server."""
+
+    def __init__(self, stub_url: str, **kwargs: Any) -> None:  # noqa: ANN401
+        super().__init__(**kwargs)
+        self.stub_url = stub_url
+
+    def send(self, request: PreparedRequest, **kwargs: Any) -> Response:  # noqa: ANN401
+        url = urlsplit(request.url)
+        request.url = f"{self.stub_url}/{url.netloc}{url.path}"
+        if url.query:
+            request.url += f"?{url.query}"
+        return super().send(request, **kwargs)
+
+
+class SeaTableStub(Base):
+    """Answers the queries with the fixture rows and counts the batch calls."""
+
+    def __init__(self, fixtures: Fixtures) -> None:  # noqa: PLW0231
+        self.fixtures = fixtures
+        self.calls: Counter[str] = Counter()
+        self.rows: Counter[str] = Counter()
+
+    def query(self, sql: str, convert: bool = True) -> list[dict[str, Any]]:
+        self.calls["query"] += 1
+        if "Keywords to Category" in sql:
+            return self.fixtures.keywords_rows
+        return self.fixtures.plugins_rows
+
+    def get_column_link_id(
+        self, table_name: str, column_name: str, view_name: str | None = None
+    ) -> str:
+        return "link"
+
+    def _batch(self, name: str, size: int) -> dict[str, Any]:
+        self.calls[name] += 1
+        self.rows[name] += size
+        return {}
+
+    def batch_append_rows(
+        self, table_name: str, rows_data: list[Any], apply_default: bool = False
+    ) -> dict[str, Any]:
+        self._batch("append_rows", len(rows_data))
+        return {"row_ids": [{"_id": f"new-{i}"} for i in range(len(rows_data))]}
+
+    def batch_update_rows(
+        self, table_name: str, rows_data: list[Any]
+    ) -> dict[str, Any]:
+        return self._batch("update_rows", len(rows_data))
+
+    def batch_delete_rows(self, table_name: str, row_ids: list[str]) -> dict[str, Any]:
+        return self._batch("delete_rows", len(row_ids))
+
+    def batch_add_links(
+        self,
+        link_id: str,
+        table_name: str,
+        other_table_name: str,
+        other_rows_ids_map: dict[str, list[str]],
+    ) -> dict[str, Any]:
+        return self._batch(
+            "add_links", sum(len(x) for x in other_rows_ids_map.values())
+        )
+
+    def batch_remove_links(
+        self,
+        link_id: str,
+        table_name: str,
+        other_table_name: str,
+        other_rows_ids_map: dict[str, list[str]],
+    ) -> dict[str, Any]:
+        return self._batch(
+            "remove_links", sum(len(x) for x in other_rows_ids_map.values())
+        )
@@ -0,0 +1,207 @@
+"""
+Benchmark suite: replays the fixtures through the stub servers and times
+each stage of a run at several scales.
+
+    python benchmarks/suite.py [--scales 2000 20000 100000] [--output results.json]
+
+The network stages (manifests, repository information) go through the real
+HTTP client against a local server, on at most --network-limit plugins per
+scale. Results are printed as a table and, with --output, written as JSON.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pandas as pd  # noqa: E402
+from fixtures import Fixtures, build  # noqa: E402
+from stubs import GitHubStub, RewriteAdapter, SeaTableStub  # noqa: E402
+
+import http_cache  # noqa: E402
+import http_client  # noqa: E402
+from database.automatic_category import KeywordMatcher  # noqa: E402
+from database.batch import WriteBuffer  # noqa: E402
+from database.search import get_etags_by_plugins, search_deleted_plugin  # noqa: E402
+from get_plugins import get_repository_information, manifest  # noqa: E402
+from interface import DatabaseProperties, PluginItems  # noqa: E402
+from main import track_plugins_update  # noqa: E402
+from registry import Registry  # noqa: E402
+
+SCALES = [2000, 20000, 100000]
+NETWORK_LIMIT = 2000
+WORKERS = 8
+
+
+def timed(
+    results: list[dict[str, Any]],
+    scale: int,
+    stage: str,
+    items: int,
+    func: Callable[[], Any],
+) -> Any:  # noqa: ANN401
+    # the run logs through rich: keep the output out of the terminal and the timing
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        value = func()
+        seconds = time.perf_counter() - start
+    results.append(
+        {
+            "scale": scale,
+            "stage": stage,
+            "items": items,
+            "seconds": round(seconds, 6),
+            "us_per_item": round(seconds / max(items, 1) * 1e6, 2),
+        }
+    )
+    print(f"{scale:>8} {stage:<22} {items:>8} {seconds:>10.3f}s")
+    return value
+
+
+def in_pool(
+    func: Callable[[PluginItems], Any], plugins: list[PluginItems]
+) -> list[Any]:
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        return list(executor.map(func, plugins))
+
+
+def run_scale(fixtures: Fixtures, network_limit: int) -> list[dict[str, Any]]:
+    results: list[dict[str, Any]] = []
+    scale = fixtures.scale
+    stub = GitHubStub(fixtures)
+    # a fresh HTTP cache per scale, or the manifests of the previous one answer 304
+    http_cache._store.cache = http_cache.HttpCache(Path(f".cache/http-{scale}.sqlite"))
+    http_client.configure(pool_size=WORKERS)
+    http_client.get_session().mount(
+        "https://", RewriteAdapter(stub.url, pool_maxsize=WORKERS, pool_block=True)
+    )
+    try:
+        registry = Registry()
+        timed(results, scale, "registry fetch", scale, registry.load)
+        plugins = registry.plugins()
+        sample = plugins[:network_limit]
+        timed(
+            results,
+            scale,
+            "manifest fetch",
+            len(sample),
+            lambda: in_pool(manifest, sample),
+        )
+        db = pd.json_normalize(fixtures.plugins_rows)
+        etags = timed(
+            results,
+            scale,
+            "get_etags_by_plugins",
+            len(db),
+            lambda: get_etags_by_plugins(db),
+        )
+
+        def repository(plugin: PluginItems) -> Any:  # noqa: ANN401
+            known = etags.get(plugin.id)
+            return get_repository_information(
+                plugin,
+                known.etag if known else None,
+                known.commit_date if known else None,
+            )
+
+        timed(
+            results,
+            scale,
+            "repository fetch",
+            len(sample),
+            lambda: in_pool(repository, sample),
+        )
+        for plugin in plugins:
+            commit = fixtures.commits[str(plugin.repo)]
+            plugin.last_commit_date = commit["date"][:10]
+            plugin.etag = commit["etag"]
+            plugin.isDesktopOnly = fixtures.manifests[str(plugin.repo)]["isDesktopOnly"]
+            plugin.fundingUrl = fixtures.manifests[str(plugin.repo)]["fundingUrl"]
+        keywords = pd.json_normalize(fixtures.keywords_rows)
+        timed(
+            results,
+            scale,
+            "keyword categorization",
+            scale,
+            lambda: KeywordMatcher(keywords).match_all(plugins),
+        )
+        seatable = SeaTableStub(fixtures)
+        writer = WriteBuffer(seatable, "link")
+        properties = DatabaseProperties(
+            db=db, base=seatable, keywords=keywords, commit_date=etags
+        )
+        timed(
+            results,
+            scale,
+            "track_plugins_update",
+            scale,
+            lambda: track_plugins_update(plugins, properties, writer),
+        )
+        deleted = timed(
+            results,
+            scale,
+            "search_deleted_plugin",
+            len(db),
+            lambda: search_deleted_plugin(db, plugins),
+        )
+        writer.delete_rows([row["_id"] for row in deleted.deleted])
+        plan = writer.plan()
+        timed(results, scale, "writes", len(writer), writer.flush)
+        results[-1]["api_calls"] = dict(seatable.calls)
+        results[-1]["planned"] = plan.counts
+        for result in results:
+            result["stub_requests"] = dict(stub.requests)
+    finally:
+        stub.shutdown()
+        http_client.get_session().close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES)
+    parser.add_argument("--network-limit", type=int, default=NETWORK_LIMIT)
+    parser.add_argument(
+        "--fixtures", type=Path, help="replay recorded fixtures instead"
+    )
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    args = parser.parse_args()
+    results = []
+    print(f"{'scale':>8} {'stage':<22} {'items':>8} {'time':>11}")
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = Path.cwd()
+        os.chdir(workdir)  # the HTTP cache and snapshots are written here
+        try:
+            runs = (
+                [Fixtures.replay(args.fixtures.resolve())]
+                if args.fixtures
+                else (build(x) for x in args.scales)
+            )
+            for fixtures in runs:
+                results += run_scale(fixtures, args.network_limit)
+        finally:
+            os.chdir(cwd)
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "network_limit": args.network_limit,
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+
+import requests
+from rich.console import Console
+
+import http_cache
+import http_client
+from http_cache import ArchivedState
+from interface import PluginItems
+from rate_limit import RateLimitExhaustedError
+
+ARCHIVE_TTL_DAYS = 7.0
+JITTER = 0.5  # spread the expiries so the repositories are not all due the same night
+
+
+def check_archived(plugin: PluginItems, ttl: float) -> Optional[bool]:
+    """
+    Archived state of the repository, with a conditional request on the ETag
+    of the last check: an unchanged repository answers 304.
+    """
+    cache = http_cache.get_cache()
+    repo = str(plugin.repo)
+    known = cache.archived_state(repo)
+    try:
+        response = http_client.github(
+            "GET",
+            f"https://api.github.com/repos/{repo}",
+            etag=known.etag if known else None,
+        )
+    except requests.RequestException:
+        return None
+    if response.status_code == 304 and known:  # noqa: PLR2004
+        archived, etag = known.archived, known.etag
+    elif response.status_code == 200:  # noqa: PLR2004
+        try:
+            archived = bool(response.json()["archived"])
+        except (ValueError, KeyError):
+            return None
+        etag = response.headers.get("ETag")
+    else:
+        return None
+    expires_at = time.time() + ttl * random.uniform(1, 1 + JITTER)
+    cache.set_archived_state(repo, ArchivedState(archived, etag, expires_at))
+    return archived
+
+
+def sweep_archived(
+    console: Console,
+    plugins: list[PluginItems],
+    workers: int,
+    ttl_days: float = ARCHIVE_TTL_DAYS,
+    refresh: bool = True,
+) -> None:
+    """
+    Set `archived` on the plugins: from the cache while the last check is
+    fresh, otherwise checked again concurrently. Without `refresh`, only the
+    cached states are used. Plugins already known (GraphQL) are skipped.
+    """
+    cache = http_cache.get_cache()
+    now = time.time()
+    due = []
+    for plugin in plugins:
+        if plugin.archived is not None or not plugin.repo:
+            continue
+        known = cache.archived_state(plugin.repo)
+        if known and (known.expires_at > now or not refresh):
+            plugin.archived = known.archived
+        elif refresh:
+            due.append(plugin)
+    console.log(f"Checking the archived state of {len(due)} repositories")
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            executor.submit(check_archived, plugin, ttl_days * 86400): plugin
+            for plugin in due
+        }
+        try:
+            for future in as_completed(futures):
+                futures[future].archived = future.result()
+        except RateLimitExhaustedError as e:
+            executor.shutdown(wait=True, cancel_futures=True)
+            console.log(
+                f"[bold red]{e}[/bold red]: stopping, the remaining repositories are checked on the next run"
+            )
+    archived = sum(bool(plugin.archived) for plugin in plugins)
+    console.log(f"Found {archived} archived repositories")
@@ -0,0 +1,52 @@
+import json
+from pathlib import Path
+from typing import Optional, TextIO
+
+from interface import PluginItems
+
+CHECKPOINT_PATH = Path(".cache/checkpoint.jsonl")
+
+
+class Checkpoint:
+    """
+    Append-only JSONL file of the plugins fetched during the run, one line
+    per plugin as soon as it is complete, so an interrupted run can resume
+    without fetching them again.
+    """
+
+    def __init__(self, path: Path = CHECKPOINT_PATH) -> None:
+        self.path = path
+        self.file: Optional[TextIO] = None
+
+    def load(self) -> dict[str, PluginItems]:
+        """The plugins of the previous run, indexed by ID; a torn last line is ignored."""
+        if not self.path.exists():
+            return {}
+        plugins = {}
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    plugin = PluginItems(**json.loads(line))
+                except ValueError:
+                    continue
+                plugins[plugin.id] = plugin
+        return plugins
+
+    def start(self, resume: bool = False) -> None:
+        """Open the file for the run; it is emptied unless resuming."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = self.path.open("a" if resume else "w", encoding="utf-8")
+
+    def append(self, plugins: list[PluginItems]) -> None:
+        if self.file is None:
+            return
+        for plugin in plugins:
+            self.file.write(plugin.model_dump_json() + "\n")
+        self.file.flush()
+
+    def clear(self) -> None:
+        """Drop the checkpoint once the snapshot is saved."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.path.unlink(missing_ok=True)
@@ -1,14 +1,12 @@
-import pandas as pd
+from typing import Any
+
 from interface import PluginItems, State
-from seatable_api import Base
 from utils import convert_time, generate_activity_tag
 
-from database import automatic_category
+from database.batch import WriteBuffer
 
 
-def add_new(
-    plugin: PluginItems, seatable: Base, keywords: pd.DataFrame, linked_id: str
-) -> None:
+def add_new(plugin: PluginItems, writer: WriteBuffer, suggested: list[Any]) -> None:
     new_database_entry = {
         "ID": plugin.id,
         "Name": plugin.name,
@@ -23,9 +21,6 @@ def add_new(
         "Error": False,
         "Plugin Available": True,
     }
-
-    rep = seatable.append_row("Plugins", new_database_entry)
-    if not rep:
-        return
-    automatic = automatic_category.translate_keywords_from_plugin(plugin, keywords)
-    automatic_category.update_links(seatable, linked_id, automatic, rep["_id"])
+    writer.append_row(
+        new_database_entry, [category["row_id"] for category in suggested]
+    )
@@ -6,78 +6,57 @@ from seatable_api import Base
 from utils import unique_category
 
 
-def translate_keywords_from_plugin(plugin: PluginItems, keywords: pd.DataFrame) -> list:
-    description = (
-        plugin.description.lower().replace("obsidian", "").replace("-", " ").split(" ")
-    )
-    name = plugin.name.lower().replace("obsidian", "").replace("-", " ").split(" ")
-    plugin_keywords = []
-    for index, row in keywords.iterrows():
-        if row.Keyword.lower() in description or row.Keyword.lower() in name:
-            plugin_keywords += row["Category Record"]
-    # remove duplicate in plugin_keywords
-    return unique_category(plugin_keywords)
+def tokenize(text: str) -> set[str]:
+    return set(text.lower().replace("obsidian", "").replace("-", " ").split(" "))
+
+
+class KeywordMatcher:
+    """
+    Token -> keyword rows index built once from the "Keywords to Category"
+    table. A keyword matches when it is one of the tokens of the plugin name
+    or description.
+    """
+
+    def __init__(self, keywords: pd.DataFrame) -> None:
+        self.records: list[list[Any]] = []
+        self.index: dict[str, list[int]] = {}
+        if keywords.empty:
+            return
+        for position, (keyword, records) in enumerate(
+            keywords[["Keyword", "Category Record"]].itertuples(index=False)
+        ):
+            self.records.append(records if isinstance(records, list) else [])
+            if isinstance(keyword, str):
+                self.index.setdefault(keyword.lower(), []).append(position)
+
+    def match(self, plugin: PluginItems) -> list[Any]:
+        tokens = tokenize(plugin.description) | tokenize(plugin.name)
+        positions = sorted(
+            position
+            for token in tokens & self.index.keys()
+            for position in self.index[token]
+        )
+        plugin_keywords = []
+        for position in positions:
+            plugin_keywords += self.records[position]
+        # remove duplicate in plugin_keywords
+        return unique_category(plugin_keywords)
+
+    def match_all(self, plugins: list[PluginItems]) -> dict[str, list[Any]]:
+        return {plugin.id: self.match(plugin) for plugin in plugins}
 
 
 def get_linked_table(seatable: Base) -> str:
     return seatable.get_column_link_id("Plugins", "Auto-Suggested Categories")
 
 
-def deleted_keywords(
-    database_property: dict[str, Any],
-    keywords: pd.DataFrame,
-    plugin: PluginItems,
-) -> list[Any]:
-    default_keywords = translate_keywords_from_plugin(plugin, keywords)
-    if database_property["Auto-Suggested Categories"] is None:
-        return []
-    row_ids = set(
-        item["row_id"] for item in database_property["Auto-Suggested Categories"]
-    )
-    deleted = []
-    for row_id in row_ids:
-        if row_id not in [item.get("row_id", None) for item in default_keywords]:
-            deleted.append(
-                {
-                    "row_id": row_id,
-                    "name": [
-                        name.get("display_value")
-                        for name in database_property["Auto-Suggested Categories"]
-                        if name.get("row_id") == row_id
-                    ][0],
-                }
-            )
-    return deleted
-
-
-def update_links(
-    seatable: Base,
-    linked_id: str,
-    keywords: list[Any],
-    row_id: str,
-    deleted_keywords: list[Any] | None = None,
-) -> None:
-    for category in keywords:
-        seatable.add_link(
-            linked_id,
-            "Categories",
-            "Plugins",
-            category["row_id"],
-            row_id,
-        )
-    if deleted_keywords:
-        for keyword in deleted_keywords:
-            seatable.remove_link(
-                linked_id, "Categories", "Plugins", keyword["row_id"], row_id
-            )
-
-
-def remove_duplicate(keywords_in_db: list[Any]) -> list[Any]:
-    row_ids = set(item["row_id"] for item in keywords_in_db)
-    cleaned_keywords = []
-    for row_id in row_ids:
-        if row_id not in [item.get("row_id", None) for item in cleaned_keywords]:
-            cleaned_keywords.append(
-                [item for item in keywords_in_db if item.get("row_id") == row_id][0]
-            )
-    return cleaned_keywords
+def link_diff(linked: list[Any], suggested: list[Any]) -> tuple[list[str], list[str]]:
+    """
+    Category row ids to link and to unlink so that the links of a row are
+    exactly the suggested ones. Nothing is unlinked when nothing is suggested.
+    """
+    if not suggested:
+        return [], []
+    current = {x["row_id"] for x in linked}
+    wanted = {x["row_id"] for x in suggested}
+    return sorted(wanted - current), sorted(current - wanted)
@@ -0,0 +1,252 @@
+import math
+from pathlib import Path
+from typing import Any, Callable
+
+from seatable_api import Base
+
+from interface import ChangesetPlan, FailedChunk, PlannedInsert
+from metrics import metrics
+from utils import chunked
+
+BATCH_SIZE = 1000  # max rows (or link pairs) accepted by SeaTable per batch call
+TABLE = "Plugins"
+LINKED_TABLE = "Categories"
+
+
+class WriteBuffer:
+    """
+    Collect the row updates, inserts, link changes and deletions of a run and send
+    them to SeaTable with the batch APIs, `batch_size` rows at a time.
+    """
+
+    def __init__(
+        self, seatable: Base, link_id: str, batch_size: int = BATCH_SIZE
+    ) -> None:
+        self.seatable = seatable
+        self.link_id = link_id
+        self.batch_size = batch_size
+        self.updates: dict[str, dict[str, Any]] = {}
+        self.inserts: list[dict[str, Any]] = []
+        self.insert_links: list[list[str]] = []
+        self.links_to_add: dict[str, set[str]] = {}
+        self.links_to_remove: dict[str, set[str]] = {}
+        self.deletes: list[str] = []
+
+    def update_row(self, row_id: str, row: dict[str, Any]) -> None:
+        self.updates.setdefault(row_id, {}).update(row)
+
+    def append_row(self, row: dict[str, Any], categories: list[str]) -> None:
+        """
+        Queue a new plugin; `categories` are the category row_ids to link once
+        the row exists.
+        """
+        self.inserts.append(row)
+        self.insert_links.append(categories)
+
+    def add_links(self, row_id: str, categories: list[str]) -> None:
+        for category in categories:
+            self.links_to_add.setdefault(category, set()).add(row_id)
+            self.links_to_remove.get(category, set()).discard(row_id)
+
+    def remove_links(self, row_id: str, categories: list[str]) -> None:
+        for category in categories:
+            self.links_to_remove.setdefault(category, set()).add(row_id)
+            self.links_to_add.get(category, set()).discard(row_id)
+
+    def delete_rows(self, row_ids: list[str]) -> None:
+        self.deletes = list(dict.fromkeys([*self.deletes, *row_ids]))
+
+    def __len__(self) -> int:
+        return (
+            len(self.updates)
+            + len(self.inserts)
+            + _count_links(self.links_to_add)
+            + _count_links(self.links_to_remove)
+            + len(self.deletes)
+        )
+
+    def plan(self) -> ChangesetPlan:
+        """The buffered writes, with their counts and the batch calls they need."""
+        counts = {
+            "updates": len(self.updates),
+            "inserts": len(self.inserts),
+            "links_to_add": _count_links(self.links_to_add),
+            "links_to_remove": _count_links(self.links_to_remove),
+            "deletes": len(self.deletes),
+        }
+        # new rows are linked once inserted, with the other added links
+        linked = counts["links_to_add"] + sum(len(x) for x in self.insert_links)
+        calls = {
+            "append_rows": counts["inserts"],
+            "update_rows": counts["updates"],
+            "add_links": linked,
+            "remove_links": counts["links_to_remove"],
+            "delete_rows": counts["deletes"],
+        }
+        return ChangesetPlan(
+            link_id=self.link_id,
+            updates=self.updates,
+            inserts=[
+                PlannedInsert(row=row, categories=categories)
+                for row, categories in zip(self.inserts, self.insert_links)
+            ],
+            links_to_add={k: sorted(v) for k, v in self.links_to_add.items() if v},
+            links_to_remove={
+                k: sorted(v) for k, v in self.links_to_remove.items() if v
+            },
+            deletes=self.deletes,
+            counts=counts,
+            api_calls={k: math.ceil(v / self.batch_size) for k, v in calls.items()},
+        )
+
+    @classmethod
+    def from_plan(
+        cls, seatable: Base, plan: ChangesetPlan, batch_size: int = BATCH_SIZE
+    ) -> "WriteBuffer":
+        writer = cls(seatable, plan.link_id, batch_size)
+        for row_id, row in plan.updates.items():
+            writer.update_row(row_id, row)
+        for insert in plan.inserts:
+            writer.append_row(insert.row, insert.categories)
+        for category, row_ids in plan.links_to_add.items():
+            for row_id in row_ids:
+                writer.add_links(row_id, [category])
+        for category, row_ids in plan.links_to_remove.items():
+            for row_id in row_ids:
+                writer.remove_links(row_id, [category])
+        writer.delete_rows(plan.deletes)
+        return writer
+
+    def flush(self) -> list[FailedChunk]:
+        """
+        Send everything buffered and return the chunks that failed. Inserts go
+        first so their links can be resolved to the new row ids.
+        """
+        failed: list[FailedChunk] = []
+        failed += self._flush_inserts()
+        failed += self._flush_updates()
+        failed += self._flush_links(
+            "add_links", self.links_to_add, self.seatable.batch_add_links
+        )
+        failed += self._flush_links(
+            "remove_links", self.links_to_remove, self.seatable.batch_remove_links
+        )
+        failed += self._flush_deletes()
+        self.updates, self.inserts, self.insert_links = {}, [], []
+        self.links_to_add, self.links_to_remove = {}, {}
+        self.deletes = []
+        return failed
+
+    def _flush_inserts(self) -> list[FailedChunk]:
+        failed = []
+        pending = list(zip(self.inserts, self.insert_links))
+        for chunk in chunked(pending, self.batch_size):
+            rows = [row for row, _ in chunk]
+            try:
+                metrics.count("seatable append_rows")
+                rep = self.seatable.batch_append_rows(TABLE, rows)
+            except Exception as e:
+                failed.append(
+                    FailedChunk(
+                        operation="append_rows",
+                        size=len(rows),
+                        ids=[str(row.get("ID")) for row in rows],
+                        error=str(e),
+                    )
+                )
+                continue
+            row_ids = [
+                x["_id"] if isinstance(x, dict) else x
+                for x in (rep or {}).get("row_ids", [])
+            ]
+            for row_id, (_, categories) in zip(row_ids, chunk):
+                self.add_links(row_id, categories)
+            # rows inserted without a returned id cannot be linked
+            unlinked = [(row, x) for row, x in chunk[len(row_ids) :] if x]
+            if unlinked:
+                failed.append(
+                    FailedChunk(
+                        operation="add_links",
+                        size=sum(len(x) for _, x in unlinked),
+                        ids=[str(row.get("ID")) for row, _ in unlinked],
+                        error="no row_ids in the batch_append_rows response",
+                    )
+                )
+        return failed
+
+    def _flush_updates(self) -> list[FailedChunk]:
+        failed = []
+        updates = [{"row_id": k, "row": v} for k, v in self.updates.items()]
+        for chunk in chunked(updates, self.batch_size):
+            try:
+                metrics.count("seatable update_rows")
+                self.seatable.batch_update_rows(TABLE, chunk)
+            except Exception as e:
+                failed.append(
+                    FailedChunk(
+                        operation="update_rows",
+                        size=len(chunk),
+                        ids=[x["row_id"] for x in chunk],
+                        error=str(e),
+                    )
+                )
+        return failed
+
+    def _flush_deletes(self) -> list[FailedChunk]:
+        failed = []
+        for chunk in chunked(self.deletes, self.batch_size):
+            try:
+                metrics.count("seatable delete_rows")
+                self.seatable.batch_delete_rows(TABLE, chunk)
+            except Exception as e:
+                failed.append(
+                    FailedChunk(
+                        operation="delete_rows",
+                        size=len(chunk),
+                        ids=chunk,
+                        error=str(e),
+                    )
+                )
+        return failed
+
+    def _flush_links(
+        self,
+        operation: str,
+        links: dict[str, set[str]],
+        send: Callable[[str, str, str, dict[str, list[str]]], Any],
+    ) -> list[FailedChunk]:
+        failed = []
+        pairs = [
+            (category, row_id)
+            for category, row_ids in links.items()
+            for row_id in sorted(row_ids)
+        ]
+        for chunk in chunked(pairs, self.batch_size):
+            other_rows_ids_map: dict[str, list[str]] = {}
+            for category, row_id in chunk:
+                other_rows_ids_map.setdefault(category, []).append(row_id)
+            try:
+                metrics.count(f"seatable {operation}")
+                send(self.link_id, LINKED_TABLE, TABLE, other_rows_ids_map)
+            except Exception as e:
+                failed.append(
+                    FailedChunk(
+                        operation=operation,
+                        size=len(chunk),
+                        ids=sorted({row_id for _, row_id in chunk}),
+                        error=str(e),
+                    )
+                )
+        return failed
+
+
+def _count_links(links: dict[str, set[str]]) -> int:
+    return sum(len(row_ids) for row_ids in links.values())
+
+
+def save_plan(plan: ChangesetPlan, path: Path) -> None:
+    path.write_text(plan.model_dump_json(indent=2), encoding="utf-8")
+
+
+def load_plan(path: Path) -> ChangesetPlan:
+    return ChangesetPlan.model_validate_json(path.read_text(encoding="utf-8"))
@@ -0,0 +1,187 @@
+from typing import Any
+
+import pandas as pd
+
+from interface import (
+    Changeset,
+    DatabaseRow,
+    Mismatch,
+    PluginChanges,
+    PluginItems,
+    State,
+)
+from utils import activity_tags, format_dates, parse_dates
+
+GITHUB = "https://github.com/"
+# plugin field -> SeaTable column, in the order the mismatches are logged
+FIELDS = {
+    "author": "Author",
+    "description": "Description",
+    "fundingUrl": "Funding URL",
+    "isDesktopOnly": "Mobile friendly",
+    "last_commit_date": "Last Commit Date",
+    "etag": "ETAG",
+    "status": "Status",
+    "repo": "Github Link",
+}
+
+
+def _nullable(column: pd.Series) -> pd.Series:
+    """Object column where every missing or falsy value is None."""
+    column = column.astype(object)
+    return column.where(column.notna() & column.astype(bool), None)
+
+
+def _differs(left: pd.Series, right: pd.Series) -> pd.Series:
+    """Null-safe `!=`: None and None are equal."""
+    return (left != right) & ~(left.isna() & right.isna())
+
+
+def plugins_frame(all_plugins: list[PluginItems]) -> pd.DataFrame:
+    """One row per GitHub plugin, with the values the database should hold."""
+    commit_dates = parse_dates(plugin.last_commit_date for plugin in all_plugins)
+    frame = pd.DataFrame(
+        {
+            "ID": [plugin.id for plugin in all_plugins],
+            "author": [plugin.author for plugin in all_plugins],
+            "description": [plugin.description for plugin in all_plugins],
+            "fundingUrl": [plugin.fundingUrl for plugin in all_plugins],
+            "isDesktopOnly": [plugin.isDesktopOnly for plugin in all_plugins],
+            "last_commit_date": format_dates(commit_dates),
+            "etag": [plugin.etag for plugin in all_plugins],
+            "status": activity_tags(commit_dates),
+            "repo": [plugin.repo for plugin in all_plugins],
+        },
+        dtype=object,
+    )
+    frame["position"] = range(len(all_plugins))
+    return frame
+
+
+def seatable_frame(db: pd.DataFrame) -> pd.DataFrame:
+    """
+    The database values normalized like the plugin ones; only the first row
+    of a duplicated ID is kept (duplicates are deleted at the end of the run).
+    """
+    db = db.drop_duplicates("ID", keep="first")
+    repo = _nullable(db["Github Link"])
+    return pd.DataFrame(
+        {
+            "ID": db["ID"].astype(object),
+            "_id": db["_id"].astype(object),
+            "author": _nullable(db["Author"]).map(
+                lambda x: str(x) if x is not None else None
+            ),
+            "description": db["Description"].astype(object).map(str),
+            "fundingUrl": _nullable(db["Funding URL"]),
+            "isDesktopOnly": _nullable(db["Mobile friendly"]).isna(),
+            "last_commit_date": format_dates(
+                parse_dates(_nullable(db["Last Commit Date"]))
+            ).set_axis(db.index),
+            "etag": _nullable(db["ETAG"]),
+            "status": _nullable(db["Status"]),
+            "repo": repo.str.replace(GITHUB, "", regex=False).where(repo.notna(), None),
+            "error": _nullable(db["Error"]).notna(),
+        }
+    )
+
+
+def diff_plugins(all_plugins: list[PluginItems], db: pd.DataFrame) -> Changeset:
+    """
+    Join the GitHub plugins with the database on ID once and compare every
+    field column by column.
+    """
+    github = plugins_frame(all_plugins)
+    seatable = seatable_frame(db)
+    merged = github.merge(
+        seatable, on="ID", how="left", suffixes=("", "_db"), indicator=True
+    )
+    is_new = merged["_merge"] == "left_only"
+    new = [all_plugins[position] for position in merged.loc[is_new, "position"]]
+
+    merged = merged.loc[~is_new].set_index("_id")
+    masks = mismatch_masks(merged)
+    rows = database_rows(db.drop_duplicates("ID", keep="first"))
+
+    mismatches: dict[str, list[Mismatch]] = {}
+    changes: dict[str, dict[str, Any]] = {}
+    for field, column in FIELDS.items():
+        mask = masks[field]
+        for row_id, row in merged.loc[mask, [field, f"{field}_db"]].iterrows():
+            in_db, value = row[f"{field}_db"], row[field]
+            mismatches.setdefault(row_id, []).append(
+                Mismatch(field=field, in_db=in_db, plugin=value)
+            )
+            changes.setdefault(row_id, {})[column] = database_value(field, value)
+    existing = [
+        PluginChanges(
+            row_id=row_id,
+            plugin=all_plugins[position],
+            row=rows[row_id],
+            mismatches=mismatches.get(row_id, []),
+            changes=changes.get(row_id, {}),
+        )
+        for row_id, position in merged["position"].items()
+    ]
+    return Changeset(new=new, existing=existing)
+
+
+def database_rows(db: pd.DataFrame) -> dict[str, DatabaseRow]:
+    """The fields `update` reads, as one lean row per `_id`."""
+    states = {str(x) for x in State}
+    status = _nullable(db["Status"]).map(lambda x: State(x) if x in states else None)
+    auto_suggested = db["Auto-Suggested Categories"].map(
+        lambda x: x if isinstance(x, list) else []
+    )
+    return {
+        row[0]: DatabaseRow(*row)
+        for row in zip(
+            db["_id"],
+            db["ID"].map(str),
+            db["Name"].map(str),
+            status,
+            auto_suggested,
+        )
+    }
+
+
+def mismatch_masks(merged: pd.DataFrame) -> pd.DataFrame:
+    """One boolean column per field, True where the database must be updated."""
+
+    def db(field: str) -> pd.Series:
+        return merged[f"{field}_db"]
+
+    etag = merged["etag"].fillna("").astype(str).str.replace('"', "")
+    etag_db = db("etag").fillna("").astype(str).str.replace('"', "")
+    locked = db("status").isin([str(State.ARCHIVED), str(State.MAINTENANCE)])
+    return pd.DataFrame(
+        {
+            "author": _differs(merged["author"], db("author")),
+            "description": _differs(merged["description"], db("description"))
+            & merged["description"].astype(bool),
+            "fundingUrl": _differs(merged["fundingUrl"], db("fundingUrl"))
+            & merged["fundingUrl"].notna()
+            & merged["fundingUrl"].astype(bool),
+            "isDesktopOnly": _differs(merged["isDesktopOnly"], db("isDesktopOnly"))
+            & ~merged["error"].astype(bool),
+            "last_commit_date": _differs(
+                merged["last_commit_date"], db("last_commit_date")
+            ),
+            "etag": etag != etag_db,
+            "status": _differs(merged["status"], db("status")) & ~locked,
+            "repo": _differs(merged["repo"], db("repo"))
+            & merged["repo"].notna()
+            & merged["repo"].astype(bool),
+        },
+        index=merged.index,
+    )
+
+
+def database_value(field: str, value: Any) -> Any:  # noqa: ANN401
+    """Convert a plugin value to what the SeaTable column stores."""
+    if field == "isDesktopOnly":
+        # the value is inverted; if the plugin is mobile friendly, isDesktopOnly is False
+        return not value
+    if field == "repo":
+        return f"{GITHUB}{value}"
+    return value
@@ -0,0 +1,159 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+MIRROR_PATH = Path(".cache/seatable.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    table_name TEXT NOT NULL,
+    row_id TEXT NOT NULL,
+    id TEXT,
+    mtime TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (table_name, row_id)
+);
+CREATE INDEX IF NOT EXISTS rows_id ON rows (table_name, id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    table_name TEXT PRIMARY KEY,
+    watermark TEXT,
+    columns TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class Mirror:
+    """
+    Local SQLite copy of SeaTable tables: one JSON row per `_id`, indexed by
+    row_id and plugin ID, with the highest `_mtime` seen as sync watermark.
+    """
+
+    def __init__(self, path: Path = MIRROR_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def watermark(self, table: str, columns: Optional[list[str]]) -> Optional[str]:
+        """
+        The `_mtime` to sync from, or None when the table must be pulled in
+        full (never synced, or synced with other columns).
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT watermark, columns FROM sync_state WHERE table_name = ?",
+                (table,),
+            ).fetchone()
+        if row is None or json.loads(row[1]) != columns:
+            return None
+        return row[0]
+
+    def synced(self, table: str) -> bool:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT 1 FROM sync_state WHERE table_name = ?", (table,)
+            ).fetchone()
+        return row is not None
+
+    def replace(
+        self, table: str, columns: Optional[list[str]], rows: list[dict[str, Any]]
+    ) -> None:
+        with self.lock:
+            self.db.execute("DELETE FROM rows WHERE table_name = ?", (table,))
+            self._upsert(table, rows)
+            self._set_state(table, columns, _max_mtime(rows, None))
+            self.db.commit()
+
+    def upsert(
+        self, table: str, columns: Optional[list[str]], rows: list[dict[str, Any]]
+    ) -> None:
+        with self.lock:
+            self._upsert(table, rows)
+            self._set_state(
+                table, columns, _max_mtime(rows, self._watermark_unlocked(table))
+            )
+            self.db.commit()
+
+    def prune(self, table: str, row_ids: set[str]) -> int:
+        """Delete the mirrored rows that are no longer in SeaTable."""
+        with self.lock:
+            known = {
+                x[0]
+                for x in self.db.execute(
+                    "SELECT row_id FROM rows WHERE table_name = ?", (table,)
+                )
+            }
+            gone = [(table, row_id) for row_id in known - row_ids]
+            self.db.executemany(
+                "DELETE FROM rows WHERE table_name = ? AND row_id = ?", gone
+            )
+            self.db.commit()
+        return len(gone)
+
+    def meta(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT value FROM meta WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+            self.db.commit()
+
+    def rows(self, table: str) -> list[dict[str, Any]]:
+        with self.lock:
+            cursor = self.db.execute(
+                "SELECT data FROM rows WHERE table_name = ? ORDER BY rowid", (table,)
+            )
+            return [json.loads(x[0]) for x in cursor]
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.close()
+
+    def _upsert(self, table: str, rows: list[dict[str, Any]]) -> None:
+        self.db.executemany(
+            "INSERT INTO rows VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (table_name, row_id) DO UPDATE SET "
+            "id = excluded.id, mtime = excluded.mtime, data = excluded.data",
+            [
+                (
+                    table,
+                    row["_id"],
+                    row.get("ID"),
+                    row.get("_mtime"),
+                    json.dumps(row, ensure_ascii=False),
+                )
+                for row in rows
+            ],
+        )
+
+    def _watermark_unlocked(self, table: str) -> Optional[str]:
+        row = self.db.execute(
+            "SELECT watermark FROM sync_state WHERE table_name = ?", (table,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_state(
+        self, table: str, columns: Optional[list[str]], watermark: Optional[str]
+    ) -> None:
+        self.db.execute(
+            "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)",
+            (table, watermark, json.dumps(columns)),
+        )
+
+
+def _max_mtime(rows: list[dict[str, Any]], current: Optional[str]) -> Optional[str]:
+    mtimes = [row["_mtime"] for row in rows if row.get("_mtime")]
+    if current:
+        mtimes.append(current)
+    return max(mtimes, default=None)
@@ -1,48 +1,66 @@
-from typing import Any
-
 import pandas as pd
-from interface import EtagPlugins, PluginItems
+from interface import (
+    DeletedPlugins,
+    EtagIndex,
+    EtagPlugins,
+    PluginItems,
+    RenamedPlugin,
+)
 from rich.console import Console
-from seatable_api import Base
-
-
-def get_etags_by_plugins(db: pd.DataFrame) -> list[EtagPlugins]:
-    all_plugins = db.to_dict("records")
-    all_etags = []
-    for plugin in all_plugins:
-        etag = EtagPlugins(
-            etag=plugin["ETAG"],
-            plugin_id=plugin["ID"],
-            commit_date=plugin["Last Commit Date"],
-        )
-        all_etags.append(etag)
-    return all_etags
-
 
-def get_plugin_in_database(db: pd.DataFrame, plugin: PluginItems) -> pd.DataFrame:
-    return db.loc[db["ID"] == plugin.id]
+from database.batch import WriteBuffer
 
 
-def plugin_is_in_database(db: pd.DataFrame, plugin: PluginItems) -> bool:
-    return not db.loc[db["ID"] == plugin.id].empty
+def get_etags_by_plugins(db: pd.DataFrame) -> EtagIndex:
+    """
+    Index the stored etag and commit date by plugin ID. Duplicated IDs are
+    left out: delete_duplicate removes all their rows, so they are fetched
+    again from scratch.
+    """
+    rows = db.loc[~db.duplicated("ID", keep=False), ["ID", "ETAG", "Last Commit Date"]]
+    rows = rows.astype(object).where(rows.notna(), None)
+    return {
+        plugin_id: EtagPlugins(etag=etag, plugin_id=plugin_id, commit_date=commit_date)
+        for plugin_id, etag, commit_date in rows.itertuples(index=False, name=None)
+    }
 
 
 def search_deleted_plugin(
     seatable: pd.DataFrame, all_plugins: list[PluginItems]
-) -> list[Any]:
-    deleted_plugins = []
-    for index, row in seatable.iterrows():
-        plugin = [plugin for plugin in all_plugins if plugin.id == row["ID"]]
-        if len(plugin) == 0:
-            deleted_plugins.append(row)
-    return deleted_plugins
+) -> DeletedPlugins:
+    """
+    Rows whose ID is no longer in the community list. When the row's
+    repository is still listed under another ID, the plugin was renamed
+    rather than deleted.
+    """
+    ids = {plugin.id for plugin in all_plugins}
+    repos = {plugin.repo.lower(): plugin.id for plugin in all_plugins if plugin.repo}
+    missing = seatable.loc[~seatable["ID"].isin(ids)]
+    repo = (
+        missing["Github Link"]
+        .fillna("")
+        .astype(str)
+        .str.replace("https://github.com/", "", regex=False)
+        .str.lower()
+    )
+    new_id = repo.map(repos)
+    renamed = missing.loc[new_id.notna()]
+    return DeletedPlugins(
+        deleted=missing.loc[new_id.isna()].to_dict("records"),
+        renamed=[
+            RenamedPlugin(row=row, new_id=plugin_id)
+            for row, plugin_id in zip(
+                renamed.to_dict("records"), new_id.loc[renamed.index]
+            )
+        ],
+    )
 
 
-def delete_duplicate(db: pd.DataFrame, seatable: Base, console: Console) -> None:
+def delete_duplicate(db: pd.DataFrame, writer: WriteBuffer, console: Console) -> None:
     duplicate = db[db.duplicated("ID", keep=False)]
     if duplicate.empty:
         console.log("[underline grey]No duplicate found")
         return
     duplicated_ids = list(set(duplicate["_id"].tolist()))
-    seatable.batch_delete_rows("Plugins", duplicated_ids)
-    console.log(f"[underline grey]Deleted {len(duplicated_ids)} duplicate(s)")
+    writer.delete_rows(duplicated_ids)
+    console.log(f"[underline grey]Deleting {len(duplicated_ids)} duplicate(s)")
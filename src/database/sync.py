@@ -0,0 +1,121 @@
+from pathlib import Path
+from typing import Any, Optional
+
+import pandas as pd
+from seatable_api import Base
+
+from database.automatic_category import get_linked_table
+from database.mirror import MIRROR_PATH, Mirror
+from interface import SyncResult
+
+PAGE_SIZE = 10000  # max rows returned by one SeaTable SQL query
+PLUGINS_TABLE = "Plugins"
+KEYWORDS_TABLE = "Keywords to Category"
+# the only columns the diff, the category update and the deletion search read
+PLUGIN_COLUMNS = [
+    "_id",
+    "_mtime",
+    "ID",
+    "Name",
+    "Author",
+    "Description",
+    "Funding URL",
+    "Mobile friendly",
+    "Last Commit Date",
+    "ETAG",
+    "Status",
+    "Error",
+    "Github Link",
+    "Auto-Suggested Categories",
+    "Plugin Available",
+]
+KEYWORD_COLUMNS = ["_id", "_mtime", "Keyword", "Category Record"]
+# (table, projected columns); None selects every column
+MIRRORED_TABLES: list[tuple[str, Optional[list[str]]]] = [
+    (PLUGINS_TABLE, PLUGIN_COLUMNS),
+    (KEYWORDS_TABLE, KEYWORD_COLUMNS),
+]
+STALE = "stale"  # meta key set when changes were sent to SeaTable since the last sync
+
+
+def mirror_path(dev: bool = False) -> Path:
+    """The dev and prod bases are mirrored in separate files."""
+    return MIRROR_PATH.with_stem(f"{MIRROR_PATH.stem}-dev") if dev else MIRROR_PATH
+
+
+def open_mirror(dev: bool = False) -> Mirror:
+    return Mirror(mirror_path(dev))
+
+
+def mark_stale(dev: bool = False) -> None:
+    """
+    The mirror no longer matches SeaTable once changes are sent: flag it so
+    the next run that reads it syncs first, instead of sending them again.
+    """
+    if not mirror_path(dev).exists():
+        return
+    mirror = open_mirror(dev)
+    mirror.set_meta(STALE, "1")
+    mirror.close()
+
+
+def select(
+    seatable: Base,
+    table: str,
+    columns: Optional[list[str]],
+    where: Optional[str] = None,
+) -> list[dict[str, Any]]:
+    """Run a projected query, page by page, past the 10000 rows of one query."""
+    fields = ", ".join(f"`{column}`" for column in columns) if columns else "*"
+    condition = f" WHERE {where}" if where else ""
+    rows: list[dict[str, Any]] = []
+    while True:
+        page = seatable.query(
+            f"SELECT {fields} FROM `{table}`{condition} ORDER BY `_id`"
+            f" LIMIT {PAGE_SIZE} OFFSET {len(rows)}"
+        )
+        rows += page or []
+        if not page or len(page) < PAGE_SIZE:
+            return rows
+
+
+def sync_table(
+    seatable: Base, mirror: Mirror, table: str, columns: Optional[list[str]]
+) -> SyncResult:
+    """
+    Bring the mirror of `table` up to date: only the rows modified since the
+    last sync are downloaded, then the rows deleted upstream are pruned.
+    """
+    watermark = mirror.watermark(table, columns)
+    if watermark is None:
+        rows = select(seatable, table, columns)
+        mirror.replace(table, columns, rows)
+        return SyncResult(table=table, full=True, modified=len(rows), deleted=0)
+    rows = select(seatable, table, columns, f"`_mtime` >= '{watermark}'")
+    mirror.upsert(table, columns, rows)
+    row_ids = {row["_id"] for row in select(seatable, table, ["_id"])}
+    deleted = mirror.prune(table, row_ids)
+    return SyncResult(table=table, full=False, modified=len(rows), deleted=deleted)
+
+
+def sync_all(seatable: Base, mirror: Mirror) -> list[SyncResult]:
+    """Sync every mirrored table, and the link column id used to write links."""
+    results = [
+        sync_table(seatable, mirror, table, columns)
+        for table, columns in MIRRORED_TABLES
+    ]
+    mirror.set_meta("link_id", get_linked_table(seatable))
+    mirror.set_meta(STALE, "")
+    return results
+
+
+def mirror_frame(
+    mirror: Mirror, table: str, columns: Optional[list[str]] = None
+) -> pd.DataFrame:
+    """The mirrored table as the DataFrame the rest of the run expects."""
+    if not mirror.synced(table):
+        raise ValueError(f"{table} is not mirrored yet, run once with --sync")
+    frame = pd.json_normalize(mirror.rows(table))
+    return frame.reindex(
+        columns=list(dict.fromkeys([*(columns or []), *frame.columns]))
+    )
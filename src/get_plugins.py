@@ -1,75 +1,197 @@
 import json
-import os
-import re
-import urllib.error
-import urllib.request
-from datetime import datetime
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Optional
 
-import requests
+import github_graphql
+import http_cache
+import http_client
+import snapshot
+from checkpoint import Checkpoint
 from interface import (
-    EtagPlugins,
+    EtagIndex,
     Manifest,
+    ManifestFields,
     PluginItems,
     RepositoryInformationDate,
+    Shard,
     Task_Info,
     UnDate,
     UnString,
 )
-from utils import convert_time, get_len_of_plugin
+from rate_limit import RateLimitExhaustedError
+from registry import get_registry
+from shard import checkpoint_path as shard_checkpoint_path
+from shard import select
+from shard import snapshot_path as shard_snapshot_path
+from utils import chunked, convert_time
 
+DEFAULT_WORKERS = 8
+SNAPSHOT_TTL = 2 * 86400  # seconds before a plugin of the snapshot is fetched again
+JITTER = 1.0  # spread the expiries so each nightly run refetches a slice
+REGISTRY_FIELDS = ("name", "description", "author", "repo")
 
-def manifest(plugin: PluginItems) -> Manifest:
-    try:
-        with urllib.request.urlopen(
-            f"https://raw.githubusercontent.com/{plugin.repo}/master/manifest.json"
-        ) as url:
-            manifest = json.loads(url.read().decode())
-            return Manifest(**manifest)
-    except urllib.error.HTTPError:
-        with urllib.request.urlopen(
-            f"https://raw.githubusercontent.com/{plugin.repo}/main/manifest.json"
-        ) as url:
-            manifest = json.loads(url.read().decode())
-            return Manifest(**manifest)
-
-
-def get_raw_data(
-    commit_date: list[EtagPlugins],
+
+MANIFEST_BRANCHES = ("master", "main")
+
+
+def manifest(plugin: PluginItems) -> ManifestFields:
+    """
+    Fetch manifest.json through the on-disk cache: the branch that worked
+    last time is tried first, with a conditional request. An unchanged
+    manifest is not parsed again: its fields are cached with the body.
+    """
+    cache = http_cache.get_cache()
+    known = cache.manifest_branch(str(plugin.repo))
+    branches = [known] if known else []
+    branches += [x for x in MANIFEST_BRANCHES if x != known]
+    status = None
+    for branch in branches:
+        url = f"https://raw.githubusercontent.com/{plugin.repo}/{branch}/manifest.json"
+        response = cache.get(url)
+        if response.body is not None:
+            if branch != known:
+                cache.set_manifest_branch(str(plugin.repo), branch)
+            fields = cache.manifest_fields(url) if response.from_cache else None
+            if fields is None:
+                parsed = Manifest(**json.loads(response.body))
+                fields = ManifestFields(parsed.isDesktopOnly, first_funding_url(parsed))
+                cache.set_manifest_fields(url, fields)
+            return fields
+        status = response.status
+    raise Exception(f"No manifest found for {plugin.repo} (HTTP {status})")
+
+
+def fetch_plugin(
+    plugin: PluginItems,
+    commit_date: EtagIndex,
     task_info: Task_Info,
-    max_length: Optional[int] = None,
-) -> tuple[list[PluginItems], Task_Info]:
-    url = "https://raw.githubusercontent.com/obsidianmd/obsidian-releases/master/community-plugins.json"
-    content = urllib.request.urlopen(url).read()
-    data: list[PluginItems] = [PluginItems(**x) for x in json.loads(content)]
-    if max_length:
-        data = data[:max_length]
-        # task_info.Progress.console.log(f"Fetching {max_length} plugins")
-    for plugin in data:
-        task_info.Progress.update(task_info.Task, description=f"Fetching {plugin.name}")
-        plugin_manifest = manifest(plugin)
-        plugin.isDesktopOnly = (
-            plugin_manifest.isDesktopOnly
-            if plugin_manifest.isDesktopOnly is not None
-            else True
-        )  # is None => Desktop Only plugin because too old
-        plugin.fundingUrl = first_funding_url(plugin_manifest)
-        db_plugin_date = [x for x in commit_date if x.plugin_id == plugin.id]
-        etag = None
-        last_commit_date = None
-        task_info.Progress.update(task_info.Task, advance=0.5)
-        if len(db_plugin_date) > 0:
-            db_plugin_date = db_plugin_date[0]
-            etag = db_plugin_date.etag
-            last_commit_date = db_plugin_date.commit_date
-        repo_info = get_repository_information(
-            plugin, etag, last_commit_date=last_commit_date
+    repository: bool = True,
+) -> PluginItems:
+    """
+    Fetch the manifest of the plugin and, unless `repository` is False (the
+    GraphQL mode fetches it in batches), its last commit date.
+    """
+    task_info.Progress.update(task_info.Task, description=f"Fetching {plugin.name}")
+    plugin_manifest = manifest(plugin)
+    plugin.isDesktopOnly = (
+        plugin_manifest.isDesktopOnly
+        if plugin_manifest.isDesktopOnly is not None
+        else True
+    )  # is None => Desktop Only plugin because too old
+    plugin.fundingUrl = plugin_manifest.fundingUrl
+    db_plugin_date = commit_date.get(plugin.id)
+    etag = None
+    last_commit_date = None
+    task_info.Progress.update(task_info.Task, advance=0.5)
+    if db_plugin_date is not None:
+        etag = db_plugin_date.etag
+        last_commit_date = db_plugin_date.commit_date
+    if not repository:
+        plugin.last_commit_date = last_commit_date
+        plugin.etag = etag
+        return plugin
+    repo_info = get_repository_information(
+        plugin, etag, last_commit_date=last_commit_date
+    )
+    task_info.Progress.update(task_info.Task, advance=0.5)
+    plugin.last_commit_date = repo_info.last_commit_date
+    plugin.etag = repo_info.etag
+    mark_fetched(plugin, time.time())
+    return plugin
+
+
+def mark_fetched(plugin: PluginItems, now: float) -> None:
+    plugin.fetched_at = now
+    plugin.expires_at = now + SNAPSHOT_TTL * random.uniform(1, 1 + JITTER)
+
+
+def get_community_plugins(max_length: Optional[int] = None) -> list[PluginItems]:
+    return get_registry().plugins(max_length)
+
+
+def fetch_plugins(  # noqa
+    plugins: list[PluginItems],
+    commit_date: EtagIndex,
+    task_info: Task_Info,
+    workers: int = DEFAULT_WORKERS,
+    graphql: bool = False,
+    checkpoint: Optional[Checkpoint] = None,
+) -> list[PluginItems]:
+    """
+    Fetch the manifest and the repository information of the plugins, using
+    a pool of `workers` threads. The plugins are updated in place, so the
+    returned list keeps the given order.
+    With `graphql`, the repository information is queried in batches
+    instead of one REST call per plugin.
+    Each plugin is appended to the `checkpoint` once complete.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [
+            executor.submit(
+                fetch_plugin, plugin, commit_date, task_info, repository=not graphql
+            )
+            for plugin in plugins
+        ]
+        try:
+            for future in as_completed(futures):
+                plugin = future.result()
+                if checkpoint and not graphql:
+                    checkpoint.append([plugin])
+        except RateLimitExhaustedError as e:
+            executor.shutdown(wait=True, cancel_futures=True)
+            task_info.Progress.console.log(
+                f"[bold red]{e}[/bold red]: stopping, the remaining plugins will be fetched first on the next run"
+            )
+            return plugins
+    if graphql:
+        fetch_repositories_graphql(plugins, task_info, checkpoint)
+    return plugins
+
+
+def fetch_repositories_graphql(
+    plugins: list[PluginItems],
+    task_info: Task_Info,
+    checkpoint: Optional[Checkpoint] = None,
+) -> None:
+    """
+    Set the last commit date and archived state from batched GraphQL
+    queries. The stored etag is kept, so it does not show up as a change.
+    """
+    console = task_info.Progress.console
+    for batch in chunked(plugins, github_graphql.BATCH_SIZE):
+        task_info.Progress.update(
+            task_info.Task, description=f"Fetching {len(batch)} repositories"
         )
-        task_info.Progress.update(task_info.Task, advance=0.5)
-        plugin.last_commit_date = repo_info.last_commit_date
-        plugin.etag = repo_info.etag
-    return data, task_info
+        try:
+            repositories = github_graphql.fetch_batch(
+                [str(plugin.repo) for plugin in batch if plugin.repo]
+            )
+        except RateLimitExhaustedError as e:
+            console.log(
+                f"[bold red]{e}[/bold red]: stopping, the remaining plugins will be fetched first on the next run"
+            )
+            return
+        except Exception as e:
+            console.log(f"[bold red]GraphQL query failed[/bold red]: {e}")
+            repositories = {}
+        now = time.time()
+        fetched = []
+        for plugin in batch:
+            metadata = repositories.get(str(plugin.repo))
+            if metadata is None:  # left unfetched: retried on the next run
+                continue
+            plugin.last_commit_date = (
+                metadata.last_commit_date or plugin.last_commit_date
+            )
+            plugin.archived = metadata.archived
+            mark_fetched(plugin, now)
+            fetched.append(plugin)
+        if checkpoint:
+            checkpoint.append(fetched)
+        task_info.Progress.update(task_info.Task, advance=0.5 * len(batch))
 
 
 def first_funding_url(plugin: Manifest) -> str:
@@ -95,82 +217,126 @@ def get_repository_information(
         else:
             raise Exception("No repo found")
         url = f"https://api.github.com/repos/{owner}/{repo}/commits"
-        header = {
-            "Accept": "application/vnd.github.v3+json",
-            "Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}",
-            "X-GitHub-Api-Version": "2022-11-28",
-        }
-        if etag:
-            header["If-None-Match"] = etag
-        response = requests.get(url, headers=header)
+        response = http_client.github("GET", url, etag=etag)
         if response.status_code == 200:  # noqa: PLR2004
             data = response.json()
             last_commit_date = data[0]["commit"]["author"]["date"]
             last_commit_date = convert_time(last_commit_date)
             etag = response.headers["ETag"].replace("W/", "")
+    except RateLimitExhaustedError:
+        raise
     except Exception as e:
         print(e)
     return RepositoryInformationDate(last_commit_date=last_commit_date, etag=etag)
 
 
-def save_plugin(plugins: list[PluginItems], task_info: Task_Info) -> None:
+def save_plugin(
+    plugins: list[PluginItems],
+    task_info: Task_Info,
+    path: Path = snapshot.SNAPSHOT_PATH,
+) -> None:
     """
-    Save the plugins in a json file
+    Save the plugins in the JSONL snapshot
     """
-    file_path = Path("plugins.json")
-    plugins_json = json.dumps(
-        [x.model_dump() for x in plugins], ensure_ascii=False, indent=4
-    )
-    regex = r"\"etag\": \"\\\"(.*)\\\"\","
-    subst = '"etag": "\\1",'
-    plugins_json = re.sub(regex, subst, plugins_json)
-
-    with file_path.open("w", encoding="utf-8") as f:
-        f.write(plugins_json)
+    snapshot.write_plugins(plugins, path)
     console = task_info.Progress.console
-    console.log(f"Plugins saved in {file_path}")
+    console.log(f"Plugins saved in {path}")
 
 
-def read_plugin_json(
-    commit_date: list[EtagPlugins],
+def load_snapshot(file_path: Path) -> dict[str, PluginItems]:
+    """
+    Read the snapshot, indexed by ID. Entries written before `fetched_at`
+    existed are dated with the file modification time, and entries without
+    `expires_at` get a jittered one.
+    """
+    if not file_path.exists():
+        return {}
+    modified = file_path.stat().st_mtime
+    plugins = {}
+    for plugin in snapshot.read_plugins(file_path):
+        if plugin.expires_at is None:
+            mark_fetched(plugin, plugin.fetched_at or modified)
+        plugins[plugin.id] = plugin
+    return plugins
+
+
+def must_refetch(
+    entry: PluginItems, known: Optional[PluginItems], now: float
+) -> Optional[str]:
+    """Why the plugin must be fetched again, or None when the snapshot is fresh."""
+    if known is None:
+        return "new"
+    if any(getattr(entry, x) != getattr(known, x) for x in REGISTRY_FIELDS):
+        return "changed"
+    if known.expires_at is None or now >= known.expires_at:
+        return "expired"
+    return None
+
+
+def read_plugin_json(  # noqa
+    commit_date: EtagIndex,
     task_info: Task_Info,
     max_length: Optional[int] = None,
     force: bool = False,
+    workers: int = DEFAULT_WORKERS,
+    graphql: bool = False,
+    resume: bool = False,
+    shard: Optional[Shard] = None,
 ) -> tuple[list[PluginItems], Task_Info]:
     """
-    Read the json file and return a list of PluginItems
+    Refresh the snapshot incrementally: only the plugins that are new, whose
+    community-plugins.json entry changed or whose snapshot entry expired
+    are fetched again; the others are read from the file.
+    With `resume`, the plugins already fetched by an interrupted run are
+    taken from the checkpoint instead.
+    With a `shard`, only its slice of the community list is refreshed, into
+    its own snapshot (seeded from the main one on the first sharded run).
     """
-    nb_plugins = get_len_of_plugin()
-    file_path = Path("plugins.json")
-    if file_path.exists() and not force:
-        creation_date = file_path.stat().st_mtime
-        data = json.load(file_path.open("r", encoding="utf-8"))
-        now = datetime.now().timestamp()
-        error_message = None
-        console = task_info.Progress.console
-        if now - creation_date > 86400:  # noqa: PLR2004
-            error_message = "File too old: Fetching new data"
-        elif len(data) == 0:
-            error_message = "File is empty: Fetching new data"
-        elif nb_plugins > len(data):
-            error_message = "File too short: new plugins added"
-        console.log(f"Reading {file_path} -- ", error_message)
-        if error_message is not None:
-            task_info.Progress.update(task_info.Task, description=error_message)
-            plugins, task_info = get_raw_data(commit_date, task_info, max_length)
-            save_plugin(plugins, task_info)
-            return plugins, task_info
-        else:
-            task_info.Progress.update(
-                task_info.Task, description="File OK : Reading file"
-            )
-            plugins = [PluginItems(**x) for x in data]
-            task_info.Progress.remove_task(task_info.Task)
-            return plugins, task_info
-    else:
-        task_info.Progress.update(
-            task_info.Task, description="File not found : Fetching new data"
-        )
-        plugins, task_info = get_raw_data(commit_date, task_info, max_length)
-        save_plugin(plugins, task_info)
-        return plugins, task_info
+    file_path = snapshot.snapshot_path()
+    save_path = snapshot.SNAPSHOT_PATH
+    checkpoint = Checkpoint()
+    if shard is not None:
+        save_path = shard_snapshot_path(shard)
+        file_path = save_path if save_path.exists() else file_path
+        checkpoint = Checkpoint(shard_checkpoint_path(shard))
+    console = task_info.Progress.console
+    community = select(get_community_plugins(max_length), shard)
+    known = {} if force else load_snapshot(file_path)
+    resumed = checkpoint.load() if resume else {}
+    if resume:
+        console.log(f"Resuming from {len(resumed)} checkpointed plugins")
+        known.update(resumed)
+    checkpoint.start(resume)
+    now = time.time()
+    to_fetch: list[PluginItems] = []
+    reasons: dict[str, int] = {}
+    for entry in community:
+        reason = must_refetch(entry, known.get(entry.id), now)
+        if reason is not None:
+            reasons[reason] = reasons.get(reason, 0) + 1
+            to_fetch.append(entry)
+    summary = [f"{len(community) - len(to_fetch)} up to date"]
+    summary += [f"{count} {reason}" for reason, count in reasons.items()]
+    console.log(f"Reading {file_path} -- {', '.join(summary)}")
+    task_info.Progress.update(
+        task_info.Task,
+        total=len(community),
+        completed=len(community) - len(to_fetch),
+        description=f"Fetching {len(to_fetch)} plugins",
+    )
+    if to_fetch:
+        # oldest data first, so a run stopped by the rate limit keeps the most useful part
+        to_fetch.sort(key=lambda x: getattr(known.get(x.id), "fetched_at", 0) or 0)
+        fetch_plugins(to_fetch, commit_date, task_info, workers, graphql, checkpoint)
+    fetched = {plugin.id for plugin in to_fetch if plugin.fetched_at is not None}
+    plugins: list[PluginItems] = []
+    for entry in community:
+        if entry.id in fetched:
+            plugins.append(entry)
+        elif entry.id in known:  # up to date, or left over by the rate limit
+            plugins.append(known[entry.id])
+    task_info.Progress.update(task_info.Task, completed=len(community))
+    if fetched or resumed or len(known) != len(plugins):
+        save_plugin(plugins, task_info, save_path)
+    checkpoint.clear()
+    return plugins, task_info
@@ -0,0 +1,78 @@
+import os
+from typing import Any
+
+import http_client
+from interface import RepositoryMetadata
+from utils import convert_time
+
+GRAPHQL_URL = os.getenv("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+BATCH_SIZE = 50  # repositories per query, well under GitHub's node limit
+
+REPOSITORY_FIELDS = """
+    isArchived
+    isDisabled
+    pushedAt
+    defaultBranchRef {
+      target {
+        ... on Commit {
+          authoredDate
+        }
+      }
+    }
+"""
+
+
+def build_query(repos: list[str]) -> tuple[str, dict[str, str]]:
+    """
+    One aliased `repository` field per repo; owner and name are passed as
+    variables so no escaping is needed.
+    """
+    declarations = []
+    fields = []
+    variables = {}
+    for i, repo in enumerate(repos):
+        owner, name = repo.split("/", 1)
+        variables[f"o{i}"] = owner
+        variables[f"n{i}"] = name
+        declarations.append(f"$o{i}: String!, $n{i}: String!")
+        fields.append(
+            f"r{i}: repository(owner: $o{i}, name: $n{i}) {{{REPOSITORY_FIELDS}}}"
+        )
+    query = (
+        f"query({', '.join(declarations)}) {{\n"
+        + "\n".join(fields)
+        + "\nrateLimit { cost remaining resetAt }\n}"
+    )
+    return query, variables
+
+
+def parse_repository(repo: str, node: dict[str, Any]) -> RepositoryMetadata:
+    target = (node.get("defaultBranchRef") or {}).get("target") or {}
+    return RepositoryMetadata(
+        repo=repo,
+        last_commit_date=convert_time(target.get("authoredDate")),
+        archived=node.get("isArchived"),
+        disabled=node.get("isDisabled"),
+        pushed_at=node.get("pushedAt"),
+    )
+
+
+def fetch_batch(repos: list[str]) -> dict[str, RepositoryMetadata]:
+    """
+    Query up to BATCH_SIZE repositories at once. Repositories that do not
+    exist (or could not be resolved) are left out of the result.
+    """
+    query, variables = build_query(repos)
+    response = http_client.github(
+        "POST",
+        GRAPHQL_URL,
+        resource="graphql",
+        json={"query": query, "variables": variables},
+    )
+    response.raise_for_status()
+    data = response.json().get("data") or {}
+    return {
+        repo: parse_repository(repo, data[f"r{i}"])
+        for i, repo in enumerate(repos)
+        if data.get(f"r{i}")
+    }
@@ -0,0 +1,168 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import http_client
+from interface import ManifestFields
+from metrics import metrics
+
+CACHE_PATH = Path(".cache/http.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS manifest_branches (
+    repo TEXT PRIMARY KEY,
+    branch TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS manifest_fields (
+    url TEXT PRIMARY KEY,
+    is_desktop_only INTEGER,
+    funding_url TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS archived_states (
+    repo TEXT PRIMARY KEY,
+    archived INTEGER NOT NULL,
+    etag TEXT,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class CachedResponse(NamedTuple):
+    status: int
+    body: Optional[str]
+    from_cache: bool
+
+
+class ArchivedState(NamedTuple):
+    archived: bool
+    etag: Optional[str]
+    expires_at: float
+
+
+class HttpCache:
+    """
+    SQLite store of response bodies with their ETag/Last-Modified, used to
+    send conditional requests: an unchanged resource answers 304 and the
+    stored body is returned.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def get(self, url: str, headers: Optional[dict[str, str]] = None) -> CachedResponse:
+        headers = dict(headers or {})
+        with self.lock:
+            cached = self.db.execute(
+                "SELECT etag, last_modified, body FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if cached:
+            etag, last_modified, body = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        response = http_client.get(url, headers=headers)
+        if response.status_code == 304 and cached:  # noqa: PLR2004
+            metrics.count("cache hits")
+            return CachedResponse(304, cached[2], True)
+        if response.status_code != 200:  # noqa: PLR2004
+            return CachedResponse(response.status_code, None, False)
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (
+                    url,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    response.text,
+                    time.time(),
+                ),
+            )
+            self.db.commit()
+        return CachedResponse(200, response.text, False)
+
+    def manifest_branch(self, repo: str) -> Optional[str]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT branch FROM manifest_branches WHERE repo = ?", (repo,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_manifest_branch(self, repo: str, branch: str) -> None:
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO manifest_branches VALUES (?, ?)",
+                (repo, branch),
+            )
+            self.db.commit()
+
+    def manifest_fields(self, url: str) -> Optional[ManifestFields]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT is_desktop_only, funding_url FROM manifest_fields WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        return ManifestFields(None if row[0] is None else bool(row[0]), row[1])
+
+    def set_manifest_fields(self, url: str, fields: ManifestFields) -> None:
+        is_desktop_only = (
+            None if fields.isDesktopOnly is None else int(fields.isDesktopOnly)
+        )
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO manifest_fields VALUES (?, ?, ?)",
+                (url, is_desktop_only, fields.fundingUrl),
+            )
+            self.db.commit()
+
+    def archived_state(self, repo: str) -> Optional[ArchivedState]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT archived, etag, expires_at FROM archived_states WHERE repo = ?",
+                (repo,),
+            ).fetchone()
+        return ArchivedState(bool(row[0]), row[1], row[2]) if row else None
+
+    def set_archived_state(self, repo: str, state: ArchivedState) -> None:
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO archived_states VALUES (?, ?, ?, ?)",
+                (repo, int(state.archived), state.etag, state.expires_at),
+            )
+            self.db.commit()
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.close()
+
+
+class _Store:
+    cache: Optional[HttpCache] = None
+    lock = threading.Lock()
+
+
+_store = _Store()
+
+
+def get_cache() -> HttpCache:
+    with _store.lock:
+        if _store.cache is None:
+            _store.cache = HttpCache()
+        return _store.cache
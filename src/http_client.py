@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from typing import Any, Optional
+
+import requests
+import seatable_api.api_gateway
+import seatable_api.main
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import metrics
+from profiling import plugin_timings
+from rate_limit import limiter
+
+TIMEOUT = (5, 30)  # (connect, read) in seconds
+POOL_SIZE = 16  # max keep-alive connections per host
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUS = (500, 502, 503, 504)
+
+
+class _Pool:
+    session: Optional[requests.Session] = None
+    size: int = POOL_SIZE
+    lock = threading.Lock()
+
+
+_pool = _Pool()
+
+
+def _new_session(pool_size: int) -> requests.Session:
+    retry = Retry(
+        total=RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    # pool_block: threads wait for a free connection instead of opening
+    # throwaway ones, so pool_size is a hard limit per host
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=pool_size,
+        pool_block=True,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.hooks["response"].append(metrics.record_response)
+    session.hooks["response"].append(plugin_timings.record_response)
+    return session
+
+
+def configure(pool_size: int = POOL_SIZE) -> None:
+    """
+    Set the number of connections kept per host; should match the number of
+    workers fetching concurrently.
+    """
+    with _pool.lock:
+        _pool.size = max(1, pool_size)
+        if _pool.session is not None:
+            _pool.session.close()
+        _pool.session = None
+
+
+def get_session() -> requests.Session:
+    with _pool.lock:
+        if _pool.session is None:
+            _pool.session = _new_session(_pool.size)
+        return _pool.session
+
+
+class _SessionRequests:
+    """
+    Stand-in for the `requests` module inside seatable_api: its calls go
+    through the shared session, so they are pooled and recorded by the
+    response hooks like the GitHub ones.
+    """
+
+    def __getattr__(self, name: str) -> Any:  # noqa: ANN401
+        if name in ("request", "get", "post", "put", "patch", "delete"):
+            return getattr(get_session(), name)
+        return getattr(requests, name)
+
+
+def instrument_seatable() -> None:
+    """Route the SeaTable API calls through the shared session."""
+    for module in (seatable_api.main, seatable_api.api_gateway):
+        module.requests = _SessionRequests()  # type: ignore
+
+
+def get(
+    url: str,
+    headers: Optional[dict[str, str]] = None,
+    **kwargs: Any,  # noqa: ANN401
+) -> requests.Response:
+    kwargs.setdefault("timeout", TIMEOUT)
+    return get_session().get(url, headers=headers, **kwargs)
+
+
+def github_headers(etag: Optional[str] = None) -> dict[str, str]:
+    header = {
+        "Accept": "application/vnd.github.v3+json",
+        "Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}",
+        "X-GitHub-Api-Version": "2022-11-28",
+    }
+    if etag:
+        header["If-None-Match"] = etag
+    return header
+
+
+def github(
+    method: str,
+    url: str,
+    resource: str = "core",
+    etag: Optional[str] = None,
+    **kwargs: Any,  # noqa: ANN401
+) -> requests.Response:
+    """
+    Request the GitHub API through the rate limiter: wait for a slot, record
+    the rate limit headers and retry once a (secondary) limit is lifted.
+    Raises RateLimitExhaustedError instead of waiting too long.
+    """
+    kwargs.setdefault("timeout", TIMEOUT)
+    while True:
+        limiter.acquire(resource)
+        response = get_session().request(
+            method, url, headers=github_headers(etag), **kwargs
+        )
+        wait = limiter.update(resource, response)
+        if not wait:
+            return response
+        if wait > limiter.max_wait:
+            limiter.acquire(resource)  # raises RateLimitExhaustedError
+        time.sleep(wait)
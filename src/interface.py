@@ -4,7 +4,6 @@ from typing import Any, NamedTuple, Optional
 
 import pandas as pd
 from pydantic import BaseModel, ConfigDict
-from rich.console import Console
 from rich.progress import Progress, TaskID
 from seatable_api import Base
 
@@ -31,6 +30,8 @@ class EtagPlugins(BaseModel):
     commit_date: UnDate = None
 
 
+type EtagIndex = dict[str, EtagPlugins]
+
 Task_Info = NamedTuple("task_info", [("Progress", Progress), ("Task", TaskID)])
 
 
@@ -47,14 +48,9 @@ class PluginItems(
     last_commit_date: UnDate = None
     etag: UnString = None
     status: Optional[State] = None
-
-
-class PluginProperties(BaseModel):
-    model_config = ConfigDict(arbitrary_types_allowed=True)
-    database_properties: dict[str, Any]
-    plugin: PluginItems
-    seatable: PluginItems
-    console: Console
+    fetched_at: Optional[float] = None  # timestamp of the last GitHub fetch
+    expires_at: Optional[float] = None  # when the snapshot entry is fetched again
+    archived: UnBool = None  # set by the archive sweep or GraphQL, None when unknown
 
 
 class Manifest(BaseModel):
@@ -69,11 +65,26 @@ class Manifest(BaseModel):
     isDesktopOnly: UnBool = None  # noqa
 
 
+class ManifestFields(NamedTuple):
+    """The manifest fields kept for a plugin, cached with the manifest body."""
+
+    isDesktopOnly: UnBool  # noqa
+    fundingUrl: str  # noqa
+
+
 class RepositoryInformationDate(BaseModel):
     last_commit_date: UnDate = None
     etag: UnString = None
 
 
+class RepositoryMetadata(BaseModel):
+    repo: str
+    last_commit_date: UnDate = None
+    archived: UnBool = None
+    disabled: UnBool = None
+    pushed_at: UnDate = None
+
+
 test_plugin: PluginItems = PluginItems(
     id="mara-test-database",
     name="mara DATABASE TEST",
@@ -88,9 +99,87 @@ test_plugin: PluginItems = PluginItems(
 )
 
 
+# plain tuples: one of each is built per plugin of the diff, without validation
+class DatabaseRow(NamedTuple):
+    row_id: str
+    id: str
+    name: str
+    status: UnState
+    auto_suggested: list[Any]
+
+
+class Mismatch(NamedTuple):
+    field: str
+    in_db: Any = None
+    plugin: Any = None
+
+
+class PluginChanges(NamedTuple):
+    row_id: str
+    plugin: PluginItems
+    row: DatabaseRow
+    mismatches: list[Mismatch]
+    changes: dict[str, Any]
+
+
+class Changeset(NamedTuple):
+    new: list[PluginItems]
+    existing: list[PluginChanges]
+
+
+class Shard(NamedTuple):
+    index: int  # 1 to count
+    count: int
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+
+class RenamedPlugin(BaseModel):
+    row: dict[str, Any]
+    new_id: str
+
+
+class DeletedPlugins(BaseModel):
+    deleted: list[dict[str, Any]] = []
+    renamed: list[RenamedPlugin] = []
+
+
+class FailedChunk(BaseModel):
+    operation: str
+    size: int
+    ids: list[str]
+    error: str
+
+
+class PlannedInsert(BaseModel):
+    row: dict[str, Any]
+    categories: list[str] = []
+
+
+class ChangesetPlan(BaseModel):
+    """Every write of a run, as planned before anything is sent to SeaTable."""
+
+    link_id: str
+    updates: dict[str, dict[str, Any]] = {}
+    inserts: list[PlannedInsert] = []
+    links_to_add: dict[str, list[str]] = {}
+    links_to_remove: dict[str, list[str]] = {}
+    deletes: list[str] = []
+    counts: dict[str, int] = {}
+    api_calls: dict[str, int] = {}
+
+
+class SyncResult(BaseModel):
+    table: str
+    full: bool
+    modified: int
+    deleted: int
+
+
 class DatabaseProperties(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
     db: pd.DataFrame
     base: Base
     keywords: pd.DataFrame
-    commit_date: list[EtagPlugins]
+    commit_date: EtagIndex
@@ -1,41 +1,63 @@
 import argparse
 import datetime
 import os
+from pathlib import Path
+from typing import Optional
 
 import pandas as pd
+from dotenv import load_dotenv
+from github import Auth, Github
+from rich import print
+from rich.console import Console
+from rich.progress import Progress
+from rich_argparse import RichHelpFormatter
+from seatable_api import Base
+
+import http_client
+import snapshot
+from archive import ARCHIVE_TTL_DAYS, sweep_archived
 from database.add_new import add_new
-from database.automatic_category import get_linked_table
+from database.automatic_category import KeywordMatcher, get_linked_table
+from database.batch import WriteBuffer, load_plan, save_plan
+from database.diff import diff_plugins
 from database.search import (
     delete_duplicate,
     get_etags_by_plugins,
-    plugin_is_in_database,
     search_deleted_plugin,
 )
+from database.sync import (
+    KEYWORD_COLUMNS,
+    KEYWORDS_TABLE,
+    PLUGIN_COLUMNS,
+    STALE,
+    mark_stale,
+    mirror_frame,
+    open_mirror,
+    sync_all,
+)
 from database.update import update
-from dotenv import load_dotenv
-from get_plugins import read_plugin_json
-from github import Auth, Github
+from get_plugins import DEFAULT_WORKERS, load_snapshot, read_plugin_json
 from interface import (
+    ChangesetPlan,
     DatabaseProperties,
-    EtagPlugins,
+    EtagIndex,
     PluginItems,
+    Shard,
     Task_Info,
     UnInt,
     test_plugin,
 )
-from rich import print
-from rich.console import Console
-from rich.progress import Progress
-from rich_argparse import RichHelpFormatter
-from seatable_api import Base
-from utils import get_len_of_plugin
+from metrics import REPORT_PATH, metrics, span
+from profiling import PROFILE_PATH, plugin_timings, profile
+from rate_limit import limiter
+from registry import get_registry
+from shard import check_shards, merge_snapshots, parse_shard, select
+from shard import snapshot_path as shard_snapshot_path
 
 load_dotenv()
 
 
-def get_database(
-    dev: bool = False,
-) -> tuple[pd.DataFrame, Base]:
+def connect(dev: bool = False, authenticate: bool = True) -> Base:
     server_url = "https://cloud.seatable.io"
     token = os.getenv("SEATABLE_API_TOKEN_PROD")
     if dev:
@@ -44,9 +66,37 @@ def get_database(
     if not token:
         raise ValueError("No token found")
 
-    table_name = "Plugins"
     base = Base(token, server_url)
-    base.auth()
+    if authenticate:
+        base.auth()
+    return base
+
+
+def get_database(
+    dev: bool = False,
+    sync: bool = False,
+    offline: bool = False,
+) -> tuple[pd.DataFrame, Base]:
+    table_name = "Plugins"
+    # offline, the base is only authenticated to sync or to send the changes
+    base = connect(dev, authenticate=not offline or sync)
+    if sync or offline:
+        # the tables are read from the local mirror, refreshed with the modified rows only
+        mirror = open_mirror(dev)
+        if not sync and mirror.meta(STALE):
+            print(
+                "[italic yellow]Changes were sent since the last sync: syncing the mirror first"
+            )
+            base.auth()
+            sync = True
+        if sync:
+            for result in sync_all(base, mirror):
+                print(
+                    f"Synced {result.table}: {'full' if result.full else 'delta'}, {result.modified} modified, {result.deleted} deleted"
+                )
+        df_seatable = mirror_frame(mirror, table_name, PLUGIN_COLUMNS)
+        mirror.close()
+        return df_seatable, base
     ## Get rows from 'Plugins' table
     lst_seatable = base.query("SELECT * FROM `" + table_name + "` LIMIT 10000")
 
@@ -54,34 +104,67 @@ def get_database(
     return df_seatable, base
 
 
+@span("fetch_seatable_data")
 def fetch_seatable_data(
-    console: Console, dev: bool
-) -> tuple[pd.DataFrame, Base, list[EtagPlugins]]:
+    console: Console, dev: bool, sync: bool = False, offline: bool = False
+) -> tuple[pd.DataFrame, Base, EtagIndex]:
     with console.status("[bold green]Fetching data from SeaTable", spinner="dots"):
-        db, base = get_database(dev)
+        db, base = get_database(dev, sync, offline)
         commits_from_db = get_etags_by_plugins(db)
     console.log(f"Found {len(db)} plugins in the database")
     return db, base, commits_from_db
 
 
-def get_keyword_to_category(seatable: Base) -> tuple[pd.DataFrame, str]:
+@span("get_keyword_to_category")
+def get_keyword_to_category(
+    seatable: Base, dev: bool = False, mirrored: bool = False
+) -> tuple[pd.DataFrame, str]:
     table_name = "Keywords to Category"
+    if mirrored:
+        mirror = open_mirror(dev)
+        df_seatable = mirror_frame(mirror, KEYWORDS_TABLE, KEYWORD_COLUMNS)
+        link_id = mirror.meta("link_id") or get_linked_table(seatable)
+        mirror.close()
+        return df_seatable, link_id
     keywords = seatable.query("SELECT * FROM `" + table_name + "` LIMIT 10000")
     df_seatable = pd.json_normalize(keywords)
     link_id = get_linked_table(seatable)
     return df_seatable, link_id
 
 
-def fetch_github_data(
+@span("fetch_github_data")
+def fetch_github_data(  # noqa
     console: Console,
     database: DatabaseProperties,
     max_length: UnInt = None,
     force: bool = False,
+    workers: int = DEFAULT_WORKERS,
+    graphql: bool = False,
+    resume: bool = False,
+    offline: bool = False,
+    shard: Optional[Shard] = None,
 ) -> list[PluginItems]:
-    len_plugins = get_len_of_plugin()
+    if offline:
+        path = snapshot.snapshot_path()
+        if shard and shard_snapshot_path(shard).exists():
+            path = shard_snapshot_path(shard)
+        if not path.exists():
+            raise ValueError(f"{path} does not exist, run once without --offline")
+        all_plugins = list(load_snapshot(path).values())
+        if max_length:
+            all_plugins = all_plugins[:max_length]
+        all_plugins = select(all_plugins, shard)
+        console.log(f"Read {len(all_plugins)} plugins from the local snapshot")
+        return all_plugins
+    registry = get_registry()
+    len_plugins = registry.count
     if max_length:
         len_plugins = max_length
-    console.log(f"Found {len_plugins} plugins on GitHub")
+    cached = " (unchanged, from cache)" if registry.from_cache else ""
+    console.log(f"Found {len_plugins} plugins on GitHub{cached}")
+    if shard:
+        len_plugins = len(select(registry.plugins(max_length), shard))
+        console.log(f"Shard {shard}: {len_plugins} plugins")
     all_plugins = []
     commit_from_db = database.commit_date
     with Progress() as progress:
@@ -96,80 +179,164 @@ def fetch_github_data(
                 task_info,
                 max_length=max_length,
                 force=force,
+                workers=workers,
+                graphql=graphql,
+                resume=resume,
+                shard=shard,
             )  # noqa
     console.log(f"Fetched {len(all_plugins)} plugins")
     return all_plugins
 
 
+@span("merge_shards")
+def merge_shards(
+    console: Console, paths: list[Path], max_length: UnInt = None
+) -> list[PluginItems]:
+    merged, missing = merge_snapshots(paths, get_registry().plugins(max_length))
+    console.log(
+        f"Merged {len(merged)} plugins from {len(paths)} shards into {snapshot.SNAPSHOT_PATH}"
+    )
+    if missing:
+        console.log(
+            f"[italic yellow]{len(missing)} listed plugins are in no shard snapshot"
+        )
+    # listed plugins that no shard fetched are still listed: not deleted
+    return merged + missing
+
+
+@span("track_plugins_update")
 def track_plugins_update(
     all_plugins: list[PluginItems],
     databaseProperties: DatabaseProperties,  # noqa: N803
-    link_id: str,
+    writer: WriteBuffer,
     archive: bool = False,
     new_only: bool = False,
 ) -> None:
     db = databaseProperties.db
-    base = databaseProperties.base
     keywords = databaseProperties.keywords
+    changeset = diff_plugins(all_plugins, db)
+    suggested = KeywordMatcher(keywords).match_all(all_plugins)
     with Progress() as progress:
         update_task = progress.add_task(
             "[bold green]Updating plugins", total=len(all_plugins)
         )
         task_info = Task_Info(progress, update_task)
-        for plugin in all_plugins:
-            if plugin_is_in_database(db, plugin):
-                task_info.Progress.update(
-                    task_info.Task,
-                    description=f"[italic green]Checking [{plugin.name}]",
-                )
-                if new_only:
-                    continue  # skip to next plugin if new_only is True
-                try:
+        for plugin in changeset.new:
+            task_info.Progress.update(
+                task_info.Task, description=f"[underline blue]Adding {plugin.name}"
+            )
+            with plugin_timings.plugin(plugin.id, "add_new"):
+                add_new(plugin, writer, suggested[plugin.id])
+            task_info.Progress.update(task_info.Task, advance=1)
+        for plugin_changes in changeset.existing:
+            plugin = plugin_changes.plugin
+            task_info.Progress.update(
+                task_info.Task,
+                description=f"[italic green]Checking [{plugin.name}]",
+            )
+            if new_only:
+                # skip to next plugin if new_only is True
+                task_info.Progress.update(task_info.Task, advance=1)
+                continue
+            try:
+                with plugin_timings.plugin(plugin.id, "update"):
                     update(
-                        plugin, db, base, task_info, keywords, link_id, archive=archive
+                        plugin_changes,
+                        writer,
+                        task_info,
+                        suggested[plugin.id],
+                        archive=archive,
                     )
-                except Exception as e:
-                    console = task_info.Progress.console
-                    console.log(
-                        f"[bold red]Error with {plugin.name}[/bold red]: [underline]{e}"
-                    )
-                    task_info.Progress.update(task_info.Task, advance=1)
-            else:
-                task_info.Progress.update(
-                    task_info.Task, description=f"[underline blue]Adding {plugin.name}"
+            except Exception as e:
+                console = task_info.Progress.console
+                console.log(
+                    f"[bold red]Error with {plugin.name}[/bold red]: [underline]{e}"
                 )
-                add_new(plugin, base, keywords, link_id)
                 task_info.Progress.update(task_info.Task, advance=1)
 
 
-def track_plugin_deleted(  # noqa
+@span("track_plugin_deleted")
+def track_plugin_deleted(
     console: Console,
     all_plugins: list[PluginItems],
     db: pd.DataFrame,
-    base: Base,
+    writer: WriteBuffer,
+    listed: Optional[dict[str, PluginItems]] = None,
 ) -> None:
+    """
+    Delete the rows of the plugins no longer listed. The search is skipped
+    without plugins, and when some `listed` plugins (the registry ID index)
+    are missing from `all_plugins`, as after a crawl stopped on the rate
+    limit: their rows would be taken for deleted ones.
+    """
+    if not all_plugins:
+        console.log(
+            "[bold red]No plugins[/bold red]: not searching for deleted plugins"
+        )
+        return
+    fetched = {plugin.id for plugin in all_plugins}
+    unfetched = [x for x in listed or {} if x not in fetched]
+    if unfetched:
+        console.log(
+            f"[bold red]{len(unfetched)} listed plugins were not fetched[/bold red]: not searching for deleted plugins"
+        )
+        return
     with console.status("[bold red]Searching for deleted plugins", spinner="dots"):
         deleted_plugins = search_deleted_plugin(db, all_plugins)
-    if deleted_plugins:
-        console.log(f"Found {len(deleted_plugins)} deleted plugins")
-        with Progress() as progress:
-            delete = progress.add_task(
-                "[bold red]Deleting plugins", total=len(deleted_plugins)
+    # rows of renamed plugins are kept: only mark the ones not marked yet
+    renamed_plugins = [
+        x for x in deleted_plugins.renamed if x.row.get("Plugin Available") is not False
+    ]
+    if renamed_plugins:
+        console.log(f"Found {len(renamed_plugins)} renamed plugins")
+        for renamed in renamed_plugins:
+            console.log(
+                f"[italic yellow]{renamed.row['Name']} ({renamed.row['ID']}) is now {renamed.new_id}: marked as unavailable"
             )
-            task_info = Task_Info(progress, delete)
-            for plugin in deleted_plugins:
-                base.delete_row("Plugins", plugin["_id"])
-                task_info.Progress.update(
-                    task_info.Task,
-                    description=f"[italic red]Deleted {plugin['Name']}",
-                    advance=1,
-                )
-
+            writer.update_row(renamed.row["_id"], {"Plugin Available": False})
+    if deleted_plugins.deleted:
+        console.log(f"Found {len(deleted_plugins.deleted)} deleted plugins")
+        for plugin in deleted_plugins.deleted:
+            console.log(f"[italic red]Deleting {plugin['Name']} ({plugin['ID']})")
+        writer.delete_rows([plugin["_id"] for plugin in deleted_plugins.deleted])
     else:
         console.log("No deleted plugins found")
 
 
-def main(dev: bool, archive: bool, new: bool, force: bool) -> None:
+@span("send_changes")
+def send_changes(console: Console, writer: WriteBuffer, dev: bool = False) -> None:
+    if len(writer) == 0:
+        return
+    with console.status("[bold green]Sending the changes to SeaTable", spinner="dots"):
+        failed = writer.flush()
+    mark_stale(dev)
+    for chunk in failed:
+        console.log(
+            f"[bold red]Failed {chunk.operation} ({chunk.size} items)[/bold red]: [underline]{chunk.error}[/underline]\n{', '.join(chunk.ids)}"
+        )
+
+
+def describe_plan(plan: ChangesetPlan) -> str:
+    counts = ", ".join(f"{count} {name}" for name, count in plan.counts.items())
+    return f"{counts} -- {sum(plan.api_calls.values())} API call(s)"
+
+
+def main(  # noqa
+    dev: bool,
+    archive: bool,
+    new: bool,
+    force: bool,
+    workers: int = DEFAULT_WORKERS,
+    graphql: bool = False,
+    resume: bool = False,
+    sync: bool = False,
+    offline: bool = False,
+    plan: Optional[str] = None,
+    apply: Optional[str] = None,
+    archive_ttl: float = ARCHIVE_TTL_DAYS,
+    shard: Optional[Shard] = None,
+    merge: Optional[list[str]] = None,
+) -> None:
     auth = Auth.Token(os.getenv("GITHUB_TOKEN"))  # type: ignore
     octokit: Github = Github(auth=auth)
     start_time = datetime.datetime.now()
@@ -177,40 +344,86 @@ def main(dev: bool, archive: bool, new: bool, force: bool) -> None:
     max_length: int | None = None
     if dev:
         max_length = 5
-    rate_limit = octokit.get_rate_limit()
+    http_client.configure(pool_size=workers)
+    http_client.instrument_seatable()
+    console = Console()
+    if apply:
+        changes = load_plan(Path(apply))
+        console.log(f"Applying {apply}: {describe_plan(changes)}")
+        send_changes(console, WriteBuffer.from_plan(connect(dev), changes), dev)
+        return
     print(
-        f"[underline italic]Starting with:[/underline italic]:\n• Dev: {dev}\n• Archive: {archive}\n• New: {new}\n• Force: {force}\n [italic]{start_time.strftime('%d/%m/%Y - %H:%M:%S')}[/italic]"
+        f"[underline italic]Starting with:[/underline italic]:\n• Dev: {dev}\n• Archive: {archive}\n• New: {new}\n• Force: {force}\n• Workers: {workers}\n• GraphQL: {graphql}\n• Resume: {resume}\n• Sync: {sync}\n• Offline: {offline}\n• Plan: {plan}\n• Shard: {shard}\n• Merge: {merge}\n [italic]{start_time.strftime('%d/%m/%Y - %H:%M:%S')}[/italic]"
     )
+    if merge:  # before any request: a partial merge would delete plugins
+        check_shards([Path(x) for x in merge])
 
-    print(f"Rate limit: {rate_limit.core.remaining}/{rate_limit.core.limit}")
-    console = Console()
+    if not offline:
+        rate_limit = octokit.get_rate_limit()
+        print(f"Rate limit: {rate_limit.core.remaining}/{rate_limit.core.limit}")
+        limiter.seed(
+            "core",
+            rate_limit.core.remaining,
+            rate_limit.core.limit,
+            rate_limit.core.reset.timestamp(),
+        )
 
-    db, base, commits_from_db = fetch_seatable_data(console, dev)
-    keywords, link_id = get_keyword_to_category(base)
+    db, base, commits_from_db = fetch_seatable_data(console, dev, sync, offline)
+    keywords, link_id = get_keyword_to_category(base, dev, mirrored=sync or offline)
     database_properties = DatabaseProperties(
         db=db, base=base, keywords=keywords, commit_date=commits_from_db
     )
 
-    all_plugins = fetch_github_data(
-        console, database_properties, max_length=max_length, force=force
-    )
+    if merge:
+        all_plugins = merge_shards(console, [Path(x) for x in merge], max_length)
+    else:
+        all_plugins = fetch_github_data(
+            console,
+            database_properties,
+            max_length=max_length,
+            force=force,
+            workers=workers,
+            graphql=graphql,
+            resume=resume,
+            offline=offline,
+            shard=shard,
+        )
 
     if dev:
         all_plugins.append(test_plugin)
-    track_plugins_update(all_plugins, database_properties, link_id, archive, new)
-    if not dev:
-        track_plugin_deleted(console, all_plugins, db, base)
-        delete_duplicate(db, base, console)
+    writer = WriteBuffer(base, link_id)
+    if not merge:  # the shards have updated their plugins
+        if archive:
+            with span("sweep_archived"):
+                sweep_archived(console, all_plugins, workers, archive_ttl, not offline)
+        track_plugins_update(all_plugins, database_properties, writer, archive, new)
+    if shard:
+        console.log("Deleted and duplicated plugins are left to the merge step")
+    elif not dev:
+        listed = None if offline else get_registry().load().by_id
+        track_plugin_deleted(console, all_plugins, db, writer, listed)
+        with span("delete_duplicate"):
+            delete_duplicate(db, writer, console)
     else:  # find len of duplicate
         duplicate = db[db.duplicated("ID", keep=False)]
         if len(duplicate) > 0:
             duplicated_ids = list(set(duplicate["ID"].tolist()))
             console.log(
-                f"Found {len(duplicated_ids)} duplicated plugins:\n• {"\n• ".join(duplicated_ids)} "
+                f"Found {len(duplicated_ids)} duplicated plugins:\n• {'\n• '.join(duplicated_ids)} "
             )
         else:
             console.log("No duplicated plugins found")
 
+    changes = writer.plan()
+    console.log(f"Changeset: {describe_plan(changes)}")
+    if plan:
+        save_plan(changes, Path(plan))
+        console.log(f"Dry run, plan saved in {plan}")
+    else:
+        if offline:
+            base.auth()
+        send_changes(console, writer, dev)
+
     end_time = datetime.datetime.now()
     diff_time_in_min = (end_time - start_time).total_seconds() / 60
     console.log(f"Finished in {diff_time_in_min:.2f} minutes")
@@ -231,15 +444,112 @@ if __name__ == "__main__":
         "-a",
         "--archive",
         action="store_true",
-        help="Search archived plugins, not in the main because of the rate limit",
+        help="Check the archived state of the repositories, cached between runs",
+    )
+    parser.add_argument(
+        "--archive-ttl",
+        metavar="DAYS",
+        type=float,
+        default=ARCHIVE_TTL_DAYS,
+        help=f"Days before the archived state of a repository is checked again (default: {ARCHIVE_TTL_DAYS:g})",
     )
     parser.add_argument("-n", "--new", action="store_true", help="Add new plugins only")
     parser.add_argument(
         "-f",
         "--force",
         action="store_true",
-        help="Force update, create a new plugins.json file",
+        help="Force update, create a new plugins snapshot",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Number of concurrent GitHub requests (default: {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "-g",
+        "--graphql",
+        action="store_true",
+        help="Fetch the last commit date and archived state with batched GraphQL queries",
+    )
+    parser.add_argument(
+        "-r",
+        "--resume",
+        action="store_true",
+        help="Resume an interrupted run, skipping the plugins already fetched",
+    )
+    parser.add_argument(
+        "-s",
+        "--sync",
+        action="store_true",
+        help="Only download the Plugins rows modified since the last run, into a local mirror",
+    )
+    parser.add_argument(
+        "-o",
+        "--offline",
+        action="store_true",
+        help="Diff the local snapshot against the local mirror, only the changes are sent",
+    )
+    parser.add_argument(
+        "-p",
+        "--plan",
+        metavar="PATH",
+        help="Dry run: save the changes as a JSON plan instead of sending them",
+    )
+    parser.add_argument(
+        "--apply",
+        metavar="PATH",
+        help="Send the changes of a saved plan, and nothing else",
+    )
+    parser.add_argument(
+        "--report",
+        metavar="PATH",
+        default=str(REPORT_PATH),
+        help=f"Write the stage timings and HTTP calls as JSON (default: {REPORT_PATH})",
+    )
+    sharding = parser.add_mutually_exclusive_group()
+    sharding.add_argument(
+        "--shard",
+        metavar="i/N",
+        type=parse_shard,
+        help="Only fetch and update the i-th of N slices of the plugins (by hashed ID), into plugins.i-of-N.jsonl",
+    )
+    sharding.add_argument(
+        "--merge",
+        metavar="SNAPSHOT",
+        nargs="+",
+        help="Combine the snapshots of the shards, then search for deleted and duplicated plugins",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        nargs="?",
+        const=str(PROFILE_PATH),
+        help=f"Profile the run: cProfile stats in PATH (default: {PROFILE_PATH}), top functions and slowest plugins in PATH.txt",
     )
     args = parser.parse_args()
 
-    main(args.dev, args.archive, args.new, args.force)
+    profile_path = Path(args.profile) if args.profile else None
+    with profile(profile_path, Console()):
+        try:
+            main(
+                args.dev,
+                args.archive,
+                args.new,
+                args.force,
+                args.workers,
+                args.graphql,
+                args.resume,
+                args.sync,
+                args.offline,
+                args.plan,
+                args.apply,
+                args.archive_ttl,
+                args.shard,
+                args.merge,
+            )
+        finally:
+            # also on a crash or an interrupted run, for the nightly artifacts
+            metrics.print_summary(Console())
+            metrics.write(Path(args.report) if args.report else None)
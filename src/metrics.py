@@ -0,0 +1,159 @@
+import contextlib
+import json
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+import requests
+from rich.console import Console
+from rich.table import Table
+
+REPORT_PATH = Path("report.json")
+UUID = re.compile(r"[0-9a-f]{8}-?(?:[0-9a-f]{4}-?){3}[0-9a-f]{12}")
+
+
+def endpoint(url: str) -> tuple[str, str]:
+    """
+    (host, path template) of a request, with the owner, repository and
+    branch replaced so the calls of every plugin add up on one endpoint,
+    and the UUIDs (SeaTable bases) replaced by `:uuid`.
+    """
+    parts = urlsplit(url)
+    segments = [
+        ":uuid" if UUID.fullmatch(x) else x for x in parts.path.strip("/").split("/")
+    ]
+    if parts.netloc == "api.github.com" and segments[0] == "repos":
+        segments[1:3] = [":owner", ":repo"][: len(segments[1:3])]
+    elif parts.netloc == "raw.githubusercontent.com" and len(segments) > 3:  # noqa: PLR2004
+        segments[:3] = [":owner", ":repo", ":branch"]
+    return parts.netloc, "/" + "/".join(segments)
+
+
+class HttpStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.bytes = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+
+class Metrics:
+    """
+    Run-wide counters: time spent in each span, HTTP calls per host and
+    endpoint, cache hits and the lowest rate limit seen.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.spans: dict[str, list[float]] = {}
+        self.http: dict[tuple[str, str, str], HttpStats] = {}
+        self.counters: Counter[str] = Counter()
+        self.rate_limit: dict[str, int] = {}
+
+    @contextlib.contextmanager
+    def span(self, name: str) -> Any:  # noqa: ANN401
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.spans.setdefault(name, []).append(time.perf_counter() - start)
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self.lock:
+            self.counters[name] += value
+
+    def record_response(
+        self,
+        response: requests.Response,
+        *args: Any,  # noqa: ANN401
+        **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        """Response hook of the shared session."""
+        key = (response.request.method or "GET", *endpoint(response.url))
+        size = len(response.content or b"")
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        with self.lock:
+            stats = self.http.setdefault(key, HttpStats())
+            stats.calls += 1
+            stats.bytes += size
+            stats.seconds += response.elapsed.total_seconds()
+            stats.not_modified += response.status_code == 304  # noqa: PLR2004
+            stats.errors += response.status_code >= 400  # noqa: PLR2004
+            if remaining is not None:
+                resource = response.headers.get("X-RateLimit-Resource", "core")
+                self.rate_limit[resource] = min(
+                    int(remaining), self.rate_limit.get(resource, int(remaining))
+                )
+
+    def report(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                "spans": {
+                    name: {"calls": len(durations), "seconds": round(sum(durations), 3)}
+                    for name, durations in self.spans.items()
+                },
+                "http": [
+                    {
+                        "method": method,
+                        "host": host,
+                        "endpoint": path,
+                        "calls": stats.calls,
+                        "bytes": stats.bytes,
+                        "not_modified": stats.not_modified,
+                        "errors": stats.errors,
+                        "seconds": round(stats.seconds, 3),
+                    }
+                    for (method, host, path), stats in self.http.items()
+                ],
+                "counters": dict(self.counters),
+                "rate_limit_remaining": dict(self.rate_limit),
+            }
+
+    def print_summary(self, console: Console) -> None:
+        report = self.report()
+        spans = Table(title="Stages")
+        for column in ("Stage", "Calls", "Seconds"):
+            spans.add_column(column)
+        for name, span in report["spans"].items():
+            spans.add_row(name, str(span["calls"]), f"{span['seconds']:.2f}")
+        console.print(spans)
+        http = Table(title="HTTP")
+        for column in ("Host", "Endpoint", "Calls", "KiB", "304", "Errors"):
+            http.add_column(column)
+        for row in sorted(report["http"], key=lambda x: -x["calls"]):
+            http.add_row(
+                row["host"],
+                f"{row['method']} {row['endpoint']}",
+                str(row["calls"]),
+                f"{row['bytes'] / 1024:.0f}",
+                str(row["not_modified"]),
+                str(row["errors"]),
+            )
+        console.print(http)
+        counters = {
+            **report["counters"],
+            **{
+                f"rate limit remaining ({k})": v
+                for k, v in report["rate_limit_remaining"].items()
+            },
+        }
+        console.log(", ".join(f"{k}: {v}" for k, v in counters.items()))
+
+    def write(self, path: Optional[Path] = REPORT_PATH) -> None:
+        if path is None:
+            return
+        path.write_text(json.dumps(self.report(), indent=2), encoding="utf-8")
+
+
+metrics = Metrics()
+
+
+def span(name: str) -> Any:  # noqa: ANN401
+    """`with span(...)` or `@span(...)` around a stage of the run."""
+    return metrics.span(name)
@@ -0,0 +1,158 @@
+import contextlib
+import cProfile
+import io
+import pstats
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+import requests
+from rich.console import Console
+
+from metrics import endpoint
+
+PROFILE_PATH = Path("profile.pstats")
+TOP = 25
+BUCKETS = (0.001, 0.01, 0.1, 1.0, 10.0)  # upper bounds of the histogram, seconds
+
+
+class PluginTiming:
+    def __init__(self, plugin: str, stage: str) -> None:
+        self.plugin = plugin
+        self.stage = stage
+        self.seconds = 0.0
+        self.steps: dict[str, float] = {}
+        self.network: dict[str, float] = {}
+
+    def dominant(self) -> str:
+        """The slowest step, with its slowest network call if any."""
+        if not self.steps:
+            return "-"
+        step, seconds = max(self.steps.items(), key=lambda x: x[1])
+        described = f"{step} {seconds:.3f}s"
+        if self.network:
+            call, call_seconds = max(self.network.items(), key=lambda x: x[1])
+            described += f" ({call} {call_seconds:.3f}s)"
+        return described
+
+
+class PluginTimings:
+    """
+    Time spent on each plugin by `update()` and `add_new()`, split by the
+    `update_*` checks and the HTTP calls made while the plugin was processed.
+    Disabled unless the run is profiled.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.timings: list[PluginTiming] = []
+        self.local = threading.local()
+
+    @contextlib.contextmanager
+    def plugin(self, name: str, stage: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        timing = PluginTiming(name, stage)
+        self.local.current = timing
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing.seconds = time.perf_counter() - start
+            self.local.current = None
+            with self.lock:
+                self.timings.append(timing)
+
+    @contextlib.contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        timing = self._current()
+        if timing is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing.steps[name] = timing.steps.get(name, 0.0) + (
+                time.perf_counter() - start
+            )
+
+    def record_response(
+        self,
+        response: requests.Response,
+        *args: Any,  # noqa: ANN401
+        **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        """Response hook of the shared session."""
+        timing = self._current()
+        if timing is None:
+            return
+        host, path = endpoint(response.url)
+        call = f"{response.request.method} {host}{path}"
+        timing.network[call] = (
+            timing.network.get(call, 0.0) + response.elapsed.total_seconds()
+        )
+
+    def summary(self, top: int = TOP) -> str:
+        with self.lock:
+            timings = list(self.timings)
+        lines = []
+        for stage in sorted({x.stage for x in timings}):
+            durations = [x for x in timings if x.stage == stage]
+            total = sum(x.seconds for x in durations)
+            lines.append(f"{stage}: {len(durations)} plugins, {total:.3f}s")
+            lines += _histogram([x.seconds for x in durations])
+            lines.append(f"  slowest {min(top, len(durations))}:")
+            for timing in sorted(durations, key=lambda x: -x.seconds)[:top]:
+                lines.append(
+                    f"    {timing.seconds:8.3f}s  {timing.plugin}  {timing.dominant()}"
+                )
+        return "\n".join(lines)
+
+    def _current(self) -> Optional[PluginTiming]:
+        return getattr(self.local, "current", None)
+
+
+def _histogram(durations: list[float]) -> list[str]:
+    counts = [0] * (len(BUCKETS) + 1)
+    for seconds in durations:
+        counts[sum(seconds >= bound for bound in BUCKETS)] += 1
+    labels = [f"< {x * 1000:g}ms" for x in BUCKETS] + [f">= {BUCKETS[-1] * 1000:g}ms"]
+    width = max(counts, default=0) or 1
+    return [
+        f"  {label:>10} {count:>6} {'#' * round(count / width * 40)}"
+        for label, count in zip(labels, counts, strict=True)
+    ]
+
+
+plugin_timings = PluginTimings()
+
+
+@contextlib.contextmanager
+def profile(path: Optional[Path], console: Console, top: int = TOP) -> Iterator[None]:
+    """
+    Run the block under cProfile: the stats are dumped to `path`, and the top
+    functions with the per-plugin timings to `path` + .txt.
+    """
+    if path is None:
+        yield
+        return
+    plugin_timings.enabled = True
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        summary = io.StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+        summary.write(plugin_timings.summary(top))
+        text = path.with_name(f"{path.name}.txt")
+        text.write_text(summary.getvalue(), encoding="utf-8")
+        console.print(plugin_timings.summary(top), markup=False, highlight=False)
+        console.log(f"Profile saved in {path}, summary in {text}")
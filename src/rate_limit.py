@@ -0,0 +1,113 @@
+import threading
+import time
+from typing import Optional
+
+import requests
+
+RESERVE = 50  # requests kept for the rest of the run (archive checks...)
+PACE_BELOW = 500  # below this many remaining requests, spread them until reset
+MAX_WAIT = 90  # seconds; a longer wait stops the crawl instead of sleeping
+
+
+class RateLimitExhaustedError(Exception):
+    def __init__(self, resource: str, reset: float) -> None:
+        self.resource = resource
+        self.reset = reset
+        super().__init__(
+            f"GitHub {resource} rate limit exhausted until {time.strftime('%H:%M:%S', time.localtime(reset))}"
+        )
+
+
+class Bucket:
+    def __init__(self) -> None:
+        self.remaining: Optional[int] = None
+        self.limit: Optional[int] = None
+        self.reset: float = 0
+        self.blocked_until: float = 0
+        self.next_slot: float = 0
+
+
+class RateLimiter:
+    """
+    Track the GitHub rate limit from the X-RateLimit-* and Retry-After
+    headers of every response, and pace the workers so the crawl stops
+    before the quota is burnt on requests that would fail.
+    """
+
+    def __init__(
+        self,
+        reserve: int = RESERVE,
+        pace_below: int = PACE_BELOW,
+        max_wait: float = MAX_WAIT,
+    ) -> None:
+        self.reserve = reserve
+        self.pace_below = pace_below
+        self.max_wait = max_wait
+        self.buckets: dict[str, Bucket] = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, resource: str) -> Bucket:
+        return self.buckets.setdefault(resource, Bucket())
+
+    def seed(self, resource: str, remaining: int, limit: int, reset: float) -> None:
+        with self.lock:
+            bucket = self.bucket(resource)
+            bucket.remaining, bucket.limit, bucket.reset = remaining, limit, reset
+
+    def acquire(self, resource: str) -> None:
+        """Block until a request may be sent, or raise when it is not worth it."""
+        with self.lock:
+            bucket = self.bucket(resource)
+            now = time.time()
+            if bucket.reset and now >= bucket.reset:
+                bucket.remaining = bucket.limit  # new window
+            wait = max(0, bucket.blocked_until - now)
+            next_slot = None
+            if bucket.remaining is not None:
+                if bucket.remaining <= self.reserve:
+                    wait = max(wait, bucket.reset - now)
+                elif bucket.remaining < self.pace_below:
+                    interval = max(0, bucket.reset - now) / bucket.remaining
+                    slot = max(now, bucket.next_slot)
+                    next_slot = slot + interval
+                    wait = max(wait, slot - now)
+            if wait > self.max_wait:
+                # rejected: the slot stays free for the callers that proceed
+                raise RateLimitExhaustedError(resource, now + wait)
+            if next_slot is not None:
+                bucket.next_slot = next_slot
+            if bucket.remaining is not None:
+                bucket.remaining -= 1
+        if wait > 0:
+            time.sleep(wait)
+
+    def update(self, resource: str, response: requests.Response) -> float:
+        """
+        Record the rate limit headers of the response. Returns how long to
+        wait before retrying when the request was rate limited, else 0.
+        """
+        headers = response.headers
+        now = time.time()
+        with self.lock:
+            bucket = self.bucket(headers.get("X-RateLimit-Resource", resource))
+            if "X-RateLimit-Remaining" in headers:
+                remaining = int(headers["X-RateLimit-Remaining"])
+                reset = float(headers.get("X-RateLimit-Reset", bucket.reset))
+                if reset != bucket.reset or bucket.remaining is None:
+                    bucket.remaining = remaining
+                else:  # responses come back out of order
+                    bucket.remaining = min(bucket.remaining, remaining)
+                bucket.reset = reset
+                bucket.limit = int(headers.get("X-RateLimit-Limit", bucket.limit or 0))
+            if response.status_code not in (403, 429):
+                return 0
+            if "Retry-After" in headers:  # secondary rate limit
+                bucket.blocked_until = now + float(headers["Retry-After"])
+            elif bucket.remaining == 0:
+                bucket.blocked_until = bucket.reset
+            else:
+                return 0
+            return max(0, bucket.blocked_until - now)
+
+
+limiter = RateLimiter()
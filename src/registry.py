@@ -0,0 +1,62 @@
+import json
+import threading
+from typing import Optional
+
+import http_cache
+from interface import PluginItems
+
+COMMUNITY_PLUGINS_URL = "https://raw.githubusercontent.com/obsidianmd/obsidian-releases/master/community-plugins.json"
+
+
+class Registry:
+    """
+    community-plugins.json, fetched once per run through the HTTP cache: an
+    unchanged list answers 304 and is read from the cached copy.
+    """
+
+    def __init__(self, url: str = COMMUNITY_PLUGINS_URL) -> None:
+        self.url = url
+        self.entries: list[PluginItems] = []
+        self.by_id: dict[str, PluginItems] = {}
+        self.from_cache = False
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def load(self) -> "Registry":
+        with self.lock:
+            if self.loaded:
+                return self
+            response = http_cache.get_cache().get(self.url)
+            if response.body is None:
+                raise Exception(f"Cannot fetch {self.url} (HTTP {response.status})")
+            self.entries = [PluginItems(**x) for x in json.loads(response.body)]
+            self.by_id = {x.id: x for x in self.entries}
+            self.from_cache = response.from_cache
+            self.loaded = True
+            return self
+
+    @property
+    def count(self) -> int:
+        return len(self.load().entries)
+
+    def plugins(self, max_length: Optional[int] = None) -> list[PluginItems]:
+        """Copies of the entries, in registry order, safe to fill in."""
+        entries = self.load().entries
+        if max_length:
+            entries = entries[:max_length]
+        return [x.model_copy() for x in entries]
+
+
+class _Store:
+    registry: Optional[Registry] = None
+    lock = threading.Lock()
+
+
+_store = _Store()
+
+
+def get_registry() -> Registry:
+    with _store.lock:
+        if _store.registry is None:
+            _store.registry = Registry()
+        return _store.registry
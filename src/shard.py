@@ -0,0 +1,95 @@
+import argparse
+import hashlib
+import re
+from pathlib import Path
+from typing import Optional
+
+import snapshot
+from interface import PluginItems, Shard
+
+SNAPSHOT_NAME = re.compile(r"plugins\.(\d+)-of-(\d+)\.jsonl")
+
+
+class IncompleteShardsError(Exception):
+    pass
+
+
+def parse_shard(text: str) -> Shard:
+    """`i/N` from the command line, with 1 <= i <= N."""
+    try:
+        index, count = (int(x) for x in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{text!r} is not i/N") from None
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"{text!r}: i must be between 1 and N")
+    return Shard(index, count)
+
+
+def shard_of(plugin_id: str, count: int) -> int:
+    """
+    Shard of a plugin, from a hash of its ID: stable between processes and
+    runners, unlike hash().
+    """
+    digest = hashlib.sha1(plugin_id.encode(), usedforsecurity=False).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def select(plugins: list[PluginItems], shard: Optional[Shard]) -> list[PluginItems]:
+    if shard is None:
+        return plugins
+    return [x for x in plugins if shard_of(x.id, shard.count) == shard.index]
+
+
+def snapshot_path(shard: Shard) -> Path:
+    return Path(f"plugins.{shard.index}-of-{shard.count}.jsonl")
+
+
+def checkpoint_path(shard: Shard) -> Path:
+    return Path(f".cache/checkpoint.{shard.index}-of-{shard.count}.jsonl")
+
+
+def check_shards(paths: list[Path]) -> None:
+    """
+    Raise unless `paths` are the snapshots of every shard of one split, each
+    once: merging an incomplete set would report the plugins of the missing
+    shards as deleted.
+    """
+    shards = []
+    for path in paths:
+        match = SNAPSHOT_NAME.fullmatch(path.name)
+        if match is None:
+            raise IncompleteShardsError(
+                f"{path} is not a plugins.i-of-N.jsonl snapshot"
+            )
+        if not path.exists():
+            raise IncompleteShardsError(f"{path} does not exist")
+        shards.append(Shard(int(match[1]), int(match[2])))
+    counts = {x.count for x in shards}
+    if len(counts) != 1:
+        raise IncompleteShardsError(f"the snapshots are not of one split: {paths}")
+    count = counts.pop()
+    found = sorted(x.index for x in shards)
+    if found != list(range(1, count + 1)):
+        missing = sorted(set(range(1, count + 1)) - set(found))
+        raise IncompleteShardsError(
+            f"expected the {count} shards once each, missing {missing} in {found}"
+        )
+
+
+def merge_snapshots(
+    paths: list[Path], community: list[PluginItems]
+) -> tuple[list[PluginItems], list[PluginItems]]:
+    """
+    Combine the shard snapshots in the order of the community list and write
+    them as the main snapshot. Returns the merged plugins, then the community
+    entries found in no shard (left out of the snapshot). Nothing is written
+    when the set of shards is incomplete.
+    """
+    check_shards(paths)
+    fetched: dict[str, PluginItems] = {}
+    for path in paths:
+        fetched.update((x.id, x) for x in snapshot.read_plugins(path))
+    merged = [fetched[x.id] for x in community if x.id in fetched]
+    missing = [x for x in community if x.id not in fetched]
+    snapshot.write_plugins(merged, snapshot.SNAPSHOT_PATH)
+    return merged, missing
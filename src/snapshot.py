@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from pydantic import TypeAdapter
+
+from interface import PluginItems
+
+SNAPSHOT_PATH = Path("plugins.jsonl")  # one plugin per line
+LEGACY_PATH = Path("plugins.json")  # indented JSON array, still readable
+
+_PLUGIN_LIST = TypeAdapter(list[PluginItems])
+
+
+def write_plugins(plugins: list[PluginItems], path: Path = SNAPSHOT_PATH) -> None:
+    """
+    Write the plugins line by line to a temporary file, then swap it in place
+    so a crash never leaves a truncated snapshot.
+    """
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        for plugin in plugins:
+            f.write(plugin.model_dump_json())
+            f.write("\n")
+    tmp.replace(path)
+
+
+def read_plugins(path: Path) -> list[PluginItems]:
+    """
+    Read a JSONL snapshot, or a legacy JSON array. The lines are joined into
+    one array so the whole file is validated in a single TypeAdapter call.
+    """
+    raw = path.read_bytes()
+    if raw.lstrip().startswith(b"["):
+        plugins = _PLUGIN_LIST.validate_json(raw)
+        for plugin in plugins:
+            # the legacy writer stripped the quotes of the etags
+            if plugin.etag and not plugin.etag.startswith('"'):
+                plugin.etag = f'"{plugin.etag}"'
+        return plugins
+    lines = [line for line in raw.splitlines() if line.strip()]
+    return _PLUGIN_LIST.validate_json(b"[" + b",".join(lines) + b"]")
+
+
+def snapshot_path() -> Path:
+    """The snapshot to read: the JSONL one, else the legacy plugins.json."""
+    if not SNAPSHOT_PATH.exists() and LEGACY_PATH.exists():
+        return LEGACY_PATH
+    return SNAPSHOT_PATH
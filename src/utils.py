@@ -1,30 +1,48 @@
-import json
-import urllib.request
-from datetime import datetime
-from typing import Any
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, Optional
 
+import pandas as pd
 from interface import PluginItems, State, UnDate
-from seatable_api.date_utils import dateutils
+
+ACTIVE_DAYS = 365  # a plugin without commit for longer is STALE
 
 
 def generate_activity_tag(plugin: PluginItems) -> State:
-    if plugin.last_commit_date:
-        today = dateutils.now()
-        last_commit_date = plugin.last_commit_date
-        if isinstance(last_commit_date, datetime):
-            last_commit_date = last_commit_date.strftime("%Y-%m-%d")
-        diff_time = dateutils.datediff(last_commit_date, today, unit="D")
-
-        if diff_time and diff_time < 365 or diff_time == 0:  # noqa
+    return _activity_tag(convert_time(plugin.last_commit_date), date.today())
+
+
+@lru_cache(maxsize=4096)
+def _activity_tag(last_commit_date: Optional[str], today: date) -> State:
+    if last_commit_date:
+        diff_time = (today - date.fromisoformat(last_commit_date)).days
+        if diff_time < ACTIVE_DAYS:
             return State.ACTIVE
     return State.STALE
 
 
-def get_len_of_plugin() -> int:
-    url = "https://raw.githubusercontent.com/obsidianmd/obsidian-releases/master/community-plugins.json"
-    content = urllib.request.urlopen(url).read()
-    data = json.loads(content)
-    return len(data)
+def parse_dates(dates: Iterable[UnDate]) -> pd.Series:
+    """
+    Parse a whole column of commit dates at once, as days; missing or
+    unreadable dates are NaT.
+    """
+    text = pd.Series(
+        [x.strftime("%Y-%m-%d") if isinstance(x, datetime) else x for x in dates],
+        dtype=object,
+    )
+    return pd.to_datetime(text.str.slice(0, 10), format="%Y-%m-%d", errors="coerce")
+
+
+def format_dates(dates: pd.Series) -> pd.Series:
+    """The `convert_time` format of parsed dates, None where missing."""
+    return dates.dt.strftime("%Y-%m-%d").astype(object).where(dates.notna(), None)
+
+
+def activity_tags(dates: pd.Series, today: Optional[date] = None) -> pd.Series:
+    """`generate_activity_tag` for a whole column of parsed dates."""
+    days = (pd.Timestamp(today or date.today()) - dates).dt.days
+    active = days.notna() & (days < ACTIVE_DAYS)
+    return active.map({True: str(State.ACTIVE), False: str(State.STALE)}).astype(object)
 
 
 def unique_category(new_category: list[Any]) -> list[Any]:
@@ -37,13 +55,22 @@ def unique_category(new_category: list[Any]) -> list[Any]:
     return unique_data
 
 
+def chunked(items: list[Any], size: int) -> Iterator[list[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
 def convert_time(date: UnDate) -> str | None:
     if not date:
         return None
     if isinstance(date, datetime):
         return date.strftime("%Y-%m-%d")
-    else:
-        try:
-            return datetime.strptime(date, "%Y-%m-%dT%H:%M:%SZ").strftime("%Y-%m-%d")
-        except ValueError:
-            return datetime.strptime(date, "%Y-%m-%d").strftime("%Y-%m-%d")
+    return _convert_text(date)
+
+
+@lru_cache(maxsize=16384)
+def _convert_text(date: str) -> str:
+    try:
+        return datetime.strptime(date, "%Y-%m-%dT%H:%M:%SZ").strftime("%Y-%m-%d")
+    except ValueError:
+        return datetime.strptime(date, "%Y-%m-%d").strftime("%Y-%m-%d")
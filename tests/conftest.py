@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "benchmarks"))  # fixtures and stub servers
+
+
+@pytest.fixture
+def github(tmp_path: Path) -> Iterator[object]:
+    """
+    The benchmark GitHub stub serving 5 plugins, with the shared session
+    routed to it and a fresh HTTP cache.
+    """
+    import http_cache
+    import http_client
+    import registry
+    from fixtures import build
+    from stubs import GitHubStub, RewriteAdapter
+
+    stub = GitHubStub(build(5))
+    http_cache._store.cache = http_cache.HttpCache(tmp_path / "http.sqlite")
+    http_client.configure()
+    registry._store.registry = None
+    http_client.get_session().mount("https://", RewriteAdapter(stub.url))
+    yield stub
+    stub.shutdown()
+    http_client.configure()
+    http_cache._store.cache = None
+    registry._store.registry = None
@@ -0,0 +1,35 @@
+from typing import Any
+
+import http_client
+import pytest
+import requests
+from archive import check_archived
+from interface import PluginItems
+
+
+def plugin(repo: str) -> PluginItems:
+    return PluginItems(id="p", name="P", description="", repo=repo)
+
+
+def test_archived_state_is_revalidated(github: Any) -> None:
+    repo = github.fixtures.registry[0]["repo"]
+    github.archived.add(repo)
+
+    assert check_archived(plugin(repo), ttl=0) is True
+    # the second check answers 304 and keeps the cached state
+    assert check_archived(plugin(repo), ttl=0) is True
+    assert github.requests["repository"] == 2
+
+
+@pytest.mark.parametrize("body", [b"{}", b"not json"])
+def test_unexpected_payload_is_unknown(
+    monkeypatch: pytest.MonkeyPatch, github: Any, body: bytes
+) -> None:
+    def fake(*args: Any, **kwargs: Any) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response._content = body
+        return response
+
+    monkeypatch.setattr(http_client, "github", fake)
+    assert check_archived(plugin("owner/repo"), ttl=0) is None
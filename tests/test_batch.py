@@ -0,0 +1,137 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+from database.batch import WriteBuffer, load_plan, save_plan
+
+
+class FakeBase:
+    """Records the batch calls; `fail` makes the named operation raise."""
+
+    def __init__(self, fail: str = "", row_ids: bool = True) -> None:
+        self.calls: list[tuple[str, Any]] = []
+        self.fail = fail
+        self.row_ids = row_ids
+
+    def _call(self, name: str, payload: Any) -> None:  # noqa: ANN401
+        self.calls.append((name, payload))
+        if name == self.fail:
+            raise RuntimeError(f"{name} failed")
+
+    def batch_append_rows(self, table: str, rows: list[Any]) -> dict[str, Any]:
+        self._call("append_rows", rows)
+        if not self.row_ids:
+            return {}
+        return {"row_ids": [{"_id": f"new-{row['ID']}"} for row in rows]}
+
+    def batch_update_rows(self, table: str, rows: list[Any]) -> None:
+        self._call("update_rows", rows)
+
+    def batch_delete_rows(self, table: str, row_ids: list[str]) -> None:
+        self._call("delete_rows", row_ids)
+
+    def batch_add_links(self, link_id: str, *args: Any) -> None:  # noqa: ANN401
+        self._call("add_links", args[-1])
+
+    def batch_remove_links(self, link_id: str, *args: Any) -> None:  # noqa: ANN401
+        self._call("remove_links", args[-1])
+
+
+def test_flush_chunks_in_order() -> None:
+    base = FakeBase()
+    writer = WriteBuffer(base, "link", batch_size=2)  # type: ignore
+    for i in range(3):
+        writer.update_row(f"row-{i}", {"Name": f"Plugin {i}"})
+    writer.update_row("row-0", {"Author": "me"})
+    writer.append_row({"ID": "a"}, ["cat-1"])
+    writer.add_links("row-1", ["cat-1", "cat-2"])
+    writer.remove_links("row-2", ["cat-2"])
+    writer.delete_rows(["row-9", "row-8", "row-9"])
+
+    assert writer.plan().api_calls == {
+        "append_rows": 1,
+        "update_rows": 2,
+        "add_links": 2,
+        "remove_links": 1,
+        "delete_rows": 1,
+    }
+    assert writer.flush() == []
+    assert [name for name, _ in base.calls] == [
+        "append_rows",
+        "update_rows",
+        "update_rows",
+        "add_links",
+        "add_links",
+        "remove_links",
+        "delete_rows",
+    ]
+    assert base.calls[1][1][0] == {
+        "row_id": "row-0",
+        "row": {"Name": "Plugin 0", "Author": "me"},
+    }
+    # the new row is linked with the id returned by the append
+    links = {**base.calls[3][1], **base.calls[4][1]}
+    assert sorted(links["cat-1"]) == ["new-a", "row-1"]
+    assert base.calls[6][1] == ["row-9", "row-8"]
+    assert len(writer) == 0
+
+
+@pytest.mark.parametrize("operation", ["update_rows", "delete_rows", "add_links"])
+def test_failed_chunks_are_reported(operation: str) -> None:
+    writer = WriteBuffer(FakeBase(fail=operation), "link", batch_size=2)  # type: ignore
+    writer.update_row("row-1", {"Name": "x"})
+    writer.add_links("row-1", ["cat-1"])
+    writer.delete_rows(["row-2"])
+
+    failed = writer.flush()
+
+    assert [(x.operation, x.size, x.error) for x in failed] == [
+        (operation, 1, f"{operation} failed")
+    ]
+
+
+def test_failed_append_reports_plugin_ids() -> None:
+    writer = WriteBuffer(FakeBase(fail="append_rows"), "link")  # type: ignore
+    writer.append_row({"ID": "a"}, ["cat-1"])
+    writer.append_row({"ID": "b"}, [])
+
+    [failed] = writer.flush()
+
+    assert (failed.operation, failed.ids) == ("append_rows", ["a", "b"])
+
+
+def test_append_without_row_ids_reports_the_lost_links() -> None:
+    base = FakeBase(row_ids=False)
+    writer = WriteBuffer(base, "link")  # type: ignore
+    writer.append_row({"ID": "a"}, ["cat-1", "cat-2"])
+    writer.append_row({"ID": "b"}, [])
+
+    [failed] = writer.flush()
+
+    assert (failed.operation, failed.size, failed.ids) == ("add_links", 2, ["a"])
+    assert [name for name, _ in base.calls] == ["append_rows"]
+
+
+def test_saved_plan_applies_the_same_calls(tmp_path: Path) -> None:
+    def fill(writer: WriteBuffer) -> None:
+        writer.update_row("row-1", {"Name": "Plugin", "Mobile friendly": None})
+        writer.append_row({"ID": "a", "Name": "Nouveau ✓"}, ["cat-1"])
+        writer.append_row({"ID": "b"}, [])
+        writer.add_links("row-1", ["cat-1", "cat-2"])
+        writer.remove_links("row-2", ["cat-2"])
+        writer.delete_rows(["row-9"])
+
+    direct = FakeBase()
+    writer = WriteBuffer(direct, "link", batch_size=2)  # type: ignore
+    fill(writer)
+    plan = writer.plan()
+    save_plan(plan, tmp_path / "plan.json")
+    writer.flush()
+
+    loaded = load_plan(tmp_path / "plan.json")
+    assert loaded == plan
+    applied = FakeBase()
+    replayed = WriteBuffer.from_plan(applied, loaded, batch_size=2)  # type: ignore
+    assert replayed.plan() == plan
+    assert replayed.flush() == []
+    assert applied.calls == direct.calls
@@ -0,0 +1,58 @@
+import io
+from pathlib import Path
+
+import pytest
+import snapshot
+from checkpoint import CHECKPOINT_PATH, Checkpoint
+from get_plugins import read_plugin_json
+from interface import PluginItems, Task_Info
+from rich.console import Console
+from rich.progress import Progress
+
+
+def test_checkpoint_round_trip(tmp_path: Path) -> None:
+    checkpoint = Checkpoint(tmp_path / "checkpoint.jsonl")
+    checkpoint.start()
+    checkpoint.append([PluginItems(id="a", name="A", description="")])
+    checkpoint.append([PluginItems(id="b", name="B", description="", etag='"1"')])
+    checkpoint.file.write('{"id": "c", "na')  # type: ignore  # torn by a crash
+    checkpoint.file.flush()  # type: ignore
+
+    assert list(Checkpoint(checkpoint.path).load()) == ["a", "b"]
+    # resuming appends to the file, a new run empties it
+    resumed = Checkpoint(checkpoint.path)
+    resumed.start(resume=True)
+    resumed.file.close()  # type: ignore
+    assert list(Checkpoint(checkpoint.path).load()) == ["a", "b"]
+    Checkpoint(checkpoint.path).start()
+    assert Checkpoint(checkpoint.path).load() == {}
+    checkpoint.clear()
+    assert not checkpoint.path.exists()
+
+
+def test_resume_skips_the_checkpointed_plugins(
+    github: object, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    fixtures = github.fixtures  # type: ignore
+    # an interrupted run fetched the first two plugins
+    interrupted = Checkpoint()
+    interrupted.start()
+    done = [
+        PluginItems(**x, etag='"done"', fetched_at=1e10, expires_at=1e10)
+        for x in fixtures.registry[:2]
+    ]
+    interrupted.append(done)
+    interrupted.file.close()  # type: ignore
+
+    with Progress(console=Console(file=io.StringIO())) as progress:
+        task_info = Task_Info(progress, progress.add_task("", total=5))
+        plugins, _ = read_plugin_json({}, task_info, resume=True)
+
+    assert [x.id for x in plugins] == [x["id"] for x in fixtures.registry]
+    assert plugins[:2] == done
+    assert github.requests["commits"] == 3  # type: ignore
+    assert [x.id for x in snapshot.read_plugins(snapshot.SNAPSHOT_PATH)] == [
+        x.id for x in plugins
+    ]
+    assert not CHECKPOINT_PATH.exists()
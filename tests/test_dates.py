@@ -0,0 +1,43 @@
+from datetime import date, datetime, timedelta
+
+from interface import State
+from seatable_api.date_utils import dateutils
+from utils import _activity_tag, activity_tags, format_dates, parse_dates
+
+TODAY = date(2024, 3, 1)
+
+
+def reference(last_commit_date: object) -> State:
+    """The dateutils-based tag that the column-wise one replaced."""
+    if last_commit_date:
+        if isinstance(last_commit_date, datetime):
+            last_commit_date = last_commit_date.strftime("%Y-%m-%d")
+        diff_time = dateutils.datediff(last_commit_date, str(TODAY), unit="D")
+        if diff_time and diff_time < 365 or diff_time == 0:  # noqa
+            return State.ACTIVE
+    return State.STALE
+
+
+def test_tags_agree_with_dateutils() -> None:
+    days = [*range(0, 5), *range(360, 370), 1000]
+    dates: list = [str(TODAY - timedelta(days=x)) for x in days]
+    dates += [datetime(2023, 3, 2, 23, 59), datetime(2023, 3, 1), None, ""]
+
+    tags = activity_tags(parse_dates(dates), TODAY)
+
+    expected = [str(reference(x)) for x in dates]
+    assert tags.tolist() == expected
+    texts = [x.strftime("%Y-%m-%d") if isinstance(x, datetime) else x for x in dates]
+    assert [str(_activity_tag(x or None, TODAY)) for x in texts] == expected
+    assert expected.count(str(State.ACTIVE)) == 10
+
+
+def test_format_dates() -> None:
+    dates = ["2024-02-29", "2024-02-29T10:00:00Z", datetime(2024, 1, 2), None, "x"]
+    assert format_dates(parse_dates(dates)).tolist() == [
+        "2024-02-29",
+        "2024-02-29",
+        "2024-01-02",
+        None,
+        None,
+    ]
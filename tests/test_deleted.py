@@ -0,0 +1,102 @@
+import io
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from database.batch import WriteBuffer
+from get_plugins import read_plugin_json
+from interface import PluginItems, Task_Info
+from main import fetch_github_data, track_plugin_deleted
+from rate_limit import RateLimitExhaustedError, limiter
+from registry import get_registry
+from rich.console import Console
+from rich.progress import Progress
+
+
+def test_renamed_rows_are_marked_once() -> None:
+    plugins = [PluginItems(id="new-id", name="Plugin", description="", repo="a/b")]
+    db = pd.DataFrame(
+        [
+            {
+                "_id": "row-1",
+                "ID": "old-id",
+                "Name": "Plugin",
+                "Github Link": "https://github.com/a/b",
+                "Plugin Available": None,
+            },
+            {
+                "_id": "row-2",
+                "ID": "older-id",
+                "Name": "Plugin",
+                "Github Link": "https://github.com/A/B",
+                "Plugin Available": False,
+            },
+            {
+                "_id": "row-3",
+                "ID": "gone",
+                "Name": "Gone",
+                "Github Link": "https://github.com/c/d",
+                "Plugin Available": True,
+            },
+        ]
+    )
+    writer = WriteBuffer(None, "link")  # type: ignore
+
+    track_plugin_deleted(Console(file=io.StringIO()), plugins, db, writer)
+
+    assert writer.updates == {"row-1": {"Plugin Available": False}}
+    assert writer.deletes == ["row-3"]
+
+
+def test_a_crawl_stopped_by_the_rate_limit_deletes_nothing(
+    github: object, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)  # cold run: no snapshot
+    lock, allowed = threading.Lock(), [1]
+
+    def acquire(resource: str) -> None:
+        with lock:
+            if not allowed[0]:
+                raise RateLimitExhaustedError(resource, 0)
+            allowed[0] -= 1
+
+    monkeypatch.setattr(limiter, "acquire", acquire)
+    listed = get_registry().plugins()
+    db = pd.DataFrame(
+        {
+            "_id": [f"row-{x.id}" for x in listed],
+            "ID": [x.id for x in listed],
+            "Name": [x.name for x in listed],
+            "Github Link": [f"https://github.com/{x.repo}" for x in listed],
+            "Plugin Available": True,
+        }
+    )
+    with Progress(console=Console(file=io.StringIO())) as progress:
+        task_info = Task_Info(progress, progress.add_task("", total=len(listed)))
+        plugins, _ = read_plugin_json({}, task_info, workers=1)
+    writer = WriteBuffer(None, "link")  # type: ignore
+
+    track_plugin_deleted(
+        Console(file=io.StringIO()), plugins, db, writer, get_registry().by_id
+    )
+
+    assert len(plugins) == 1
+    assert len(writer) == 0
+
+
+def test_no_plugins_deletes_nothing() -> None:
+    db = pd.DataFrame([{"_id": "row-1", "ID": "a", "Name": "A", "Github Link": None}])
+    writer = WriteBuffer(None, "link")  # type: ignore
+
+    track_plugin_deleted(Console(file=io.StringIO()), [], db, writer)
+
+    assert len(writer) == 0
+
+
+def test_offline_without_snapshot(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(ValueError, match="plugins.jsonl does not exist"):
+        fetch_github_data(Console(file=io.StringIO()), None, offline=True)  # type: ignore
@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from database.diff import diff_plugins
+from interface import DatabaseRow, Mismatch, PluginItems, State
+
+RECENT = (date.today() - timedelta(days=10)).isoformat()
+OLD = (date.today() - timedelta(days=800)).isoformat()
+
+
+def plugin(plugin_id: str, **fields: object) -> PluginItems:
+    values = {
+        "id": plugin_id,
+        "name": plugin_id.title(),
+        "description": "A plugin",
+        "repo": f"someone/{plugin_id}",
+        "author": "someone",
+        "fundingUrl": "https://ko-fi.com/someone",
+        "isDesktopOnly": False,
+        "last_commit_date": RECENT,
+        "etag": '"abc"',
+    }
+    return PluginItems(**{**values, **fields})
+
+
+def row(row_id: str, plugin_id: str, **columns: object) -> dict[str, object]:
+    values = {
+        "_id": row_id,
+        "ID": plugin_id,
+        "Name": plugin_id.title(),
+        "Author": "someone",
+        "Description": "A plugin",
+        "Funding URL": "https://ko-fi.com/someone",
+        "Mobile friendly": True,
+        "Last Commit Date": RECENT,
+        "ETAG": '"abc"',
+        "Status": "ACTIVE",
+        "Error": None,
+        "Github Link": f"https://github.com/someone/{plugin_id}",
+        "Auto-Suggested Categories": [{"row_id": "cat-1"}],
+    }
+    return {**values, **columns}
+
+
+def test_diff_plugins() -> None:
+    plugins = [
+        plugin("same"),
+        plugin(
+            "changed",
+            author="other",
+            description="New description",
+            fundingUrl="https://github.com/sponsors/other",
+            isDesktopOnly=True,
+            last_commit_date=OLD,
+            etag='W/"def"',
+            repo="other/changed",
+        ),
+        # missing values on GitHub never overwrite the database
+        plugin("blank", author=None, description="", fundingUrl=""),
+        plugin("archived", last_commit_date=OLD, isDesktopOnly=True),
+        plugin("new"),
+    ]
+    db = pd.DataFrame(
+        [
+            row("row-same", "same"),
+            row("row-changed", "changed"),
+            # NaN author (empty SeaTable cell) equals a None author: no update,
+            # where the old per-field check compared nan != None
+            row(
+                "row-blank",
+                "blank",
+                Author=np.nan,
+                **{"Auto-Suggested Categories": np.nan},
+            ),
+            row("row-archived", "archived", Status="ARCHIVED", Error="timeout"),
+            row("row-same-duplicate", "same", Author="ignored"),
+            row("row-deleted", "deleted"),
+        ]
+    )
+
+    changeset = diff_plugins(plugins, db)
+
+    assert changeset.new == [plugins[4]]
+    existing = {x.row_id: x for x in changeset.existing}
+    assert list(existing) == ["row-same", "row-changed", "row-blank", "row-archived"]
+    assert existing["row-changed"].changes == {
+        "Author": "other",
+        "Description": "New description",
+        "Funding URL": "https://github.com/sponsors/other",
+        "Mobile friendly": False,
+        "Last Commit Date": OLD,
+        "ETAG": 'W/"def"',
+        "Status": "STALE",
+        "Github Link": "https://github.com/other/changed",
+    }
+    assert existing["row-changed"].mismatches[0] == Mismatch(
+        field="author", in_db="someone", plugin="other"
+    )
+    assert existing["row-changed"].plugin is plugins[1]
+    assert existing["row-same"].changes == {}
+    assert existing["row-same"].mismatches == []
+    assert existing["row-blank"].changes == {}
+    # the status of an archived row is kept, and the error hides the desktop flag
+    assert existing["row-archived"].changes == {"Last Commit Date": OLD}
+    assert existing["row-blank"].row == DatabaseRow(
+        row_id="row-blank",
+        id="blank",
+        name="Blank",
+        status=State.ACTIVE,
+        auto_suggested=[],
+    )
+    assert existing["row-archived"].row.status == State.ARCHIVED
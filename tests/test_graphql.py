@@ -0,0 +1,73 @@
+import io
+from pathlib import Path
+
+import get_plugins
+import github_graphql
+import pytest
+import requests
+from checkpoint import Checkpoint
+from interface import PluginItems, Task_Info
+from rich.console import Console
+from rich.progress import Progress
+
+
+def test_fetch_batch(github: object) -> None:
+    fixtures = github.fixtures  # type: ignore
+    repos = [x["repo"] for x in fixtures.registry[:2]]
+    github.archived.add(repos[1])  # type: ignore
+
+    result = github_graphql.fetch_batch([repos[0], "nobody/missing", repos[1]])
+
+    # the missing repository is a null node, left out of the result
+    assert list(result) == repos
+    assert [x.archived for x in result.values()] == [False, True]
+    assert result[repos[0]].last_commit_date == fixtures.commits[repos[0]]["date"][:10]
+    assert github.requests["graphql"] == 1  # type: ignore
+
+
+def test_fetch_repositories_graphql_batches(
+    github: object, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    fixtures = github.fixtures  # type: ignore
+    monkeypatch.setattr(github_graphql, "BATCH_SIZE", 2)
+    plugins = [PluginItems(**x) for x in fixtures.registry]
+    plugins.append(PluginItems(id="gone", name="Gone", description="", repo="a/b"))
+    github.archived.add(plugins[4].repo)  # type: ignore
+
+    with Progress(console=Console(file=io.StringIO())) as progress:
+        task_info = Task_Info(progress, progress.add_task("", total=len(plugins)))
+        get_plugins.fetch_repositories_graphql(plugins, task_info)
+
+    assert github.requests["graphql"] == 3  # type: ignore
+    assert [x.archived for x in plugins] == [False, False, False, False, True, None]
+    # the missing repository got no metadata: fetched again next run
+    assert [x.fetched_at is not None for x in plugins] == [True] * 5 + [False]
+    assert plugins[0].last_commit_date == fixtures.commits[plugins[0].repo]["date"][:10]
+
+
+def test_failed_batch_is_left_unfetched(
+    github: object, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    fixtures = github.fixtures  # type: ignore
+    monkeypatch.setattr(github_graphql, "BATCH_SIZE", 2)
+    fetch_batch = github_graphql.fetch_batch
+
+    def failing(repos: list[str]) -> dict:
+        if repos == [x["repo"] for x in fixtures.registry[2:4]]:
+            raise requests.HTTPError("502 Server Error")
+        return fetch_batch(repos)
+
+    monkeypatch.setattr(github_graphql, "fetch_batch", failing)
+    plugins = [PluginItems(**x) for x in fixtures.registry]
+    checkpoint = Checkpoint(tmp_path / "checkpoint.jsonl")
+    checkpoint.start()
+
+    with Progress(console=Console(file=io.StringIO())) as progress:
+        task_info = Task_Info(progress, progress.add_task("", total=len(plugins)))
+        get_plugins.fetch_repositories_graphql(plugins, task_info, checkpoint)
+
+    fetched = [x.fetched_at is not None for x in plugins]
+    assert fetched == [True, True, False, False, True]
+    assert list(Checkpoint(checkpoint.path).load()) == [
+        x.id for x, done in zip(plugins, fetched) if done
+    ]
@@ -0,0 +1,54 @@
+import random
+
+import pandas as pd
+from database.automatic_category import KeywordMatcher
+from interface import PluginItems
+from utils import unique_category
+
+WORDS = ["task", "Tasks", "calendar", "git", "daily", "note", "notes", "kanban", "vim"]
+
+
+def reference(plugin: PluginItems, keywords: pd.DataFrame) -> list:
+    """The scan over every keyword row that KeywordMatcher replaced."""
+    description = (
+        plugin.description.lower().replace("obsidian", "").replace("-", " ").split(" ")
+    )
+    name = plugin.name.lower().replace("obsidian", "").replace("-", " ").split(" ")
+    plugin_keywords = []
+    for _, row in keywords.iterrows():
+        if row.Keyword.lower() in description or row.Keyword.lower() in name:
+            plugin_keywords += row["Category Record"]
+    return unique_category(plugin_keywords)
+
+
+def random_text(rng: random.Random) -> str:
+    words = rng.choices([*WORDS, "obsidian", "obsidian-git", "Daily-Notes", ""], k=6)
+    return " ".join(words)
+
+
+def test_matcher_agrees_with_the_keyword_scan() -> None:
+    rng = random.Random(0)
+    keywords = pd.DataFrame(
+        {
+            # duplicated keywords, in several cases, sharing categories
+            "Keyword": [*WORDS, "TASK", "git"],
+            "Category Record": [
+                [{"row_id": f"c{rng.randrange(6)}", "display_value": "C"}]
+                for _ in range(len(WORDS) + 2)
+            ],
+        }
+    )
+    matcher = KeywordMatcher(keywords)
+    plugins = [
+        PluginItems(id=str(i), name=random_text(rng), description=random_text(rng))
+        for i in range(500)
+    ]
+
+    for plugin in plugins:
+        assert matcher.match(plugin) == reference(plugin, keywords), plugin
+    assert any(matcher.match(plugin) for plugin in plugins)
+
+
+def test_matcher_without_keywords() -> None:
+    matcher = KeywordMatcher(pd.DataFrame())
+    assert matcher.match(PluginItems(id="a", name="git", description="")) == []
@@ -0,0 +1,44 @@
+import io
+
+from database.automatic_category import link_diff
+from database.batch import WriteBuffer
+from database.update import update_keywords
+from interface import DatabaseRow
+from rich.console import Console
+
+
+def categories(*row_ids: str) -> list[dict[str, str]]:
+    return [{"row_id": x, "display_value": x.title()} for x in row_ids]
+
+
+def test_link_diff() -> None:
+    # duplicated links in the database count once
+    assert link_diff(categories("a", "a", "b"), categories("b", "c")) == (["c"], ["a"])
+    assert link_diff(categories("b", "a", "a"), categories("a", "b")) == ([], [])
+    assert link_diff([], categories("b", "a")) == (["a", "b"], [])
+    # nothing suggested: the links are left alone
+    assert link_diff(categories("a"), []) == ([], [])
+
+
+def test_only_the_missing_and_stale_links_are_queued() -> None:
+    writer = WriteBuffer(None, "link")  # type: ignore
+    console = Console(file=io.StringIO())
+    rows = [
+        DatabaseRow("row-1", "p1", "P1", None, categories("a", "b")),
+        DatabaseRow("row-2", "p2", "P2", None, categories("a")),
+        DatabaseRow("row-3", "p3", "P3", None, categories("a", "c")),
+    ]
+
+    changed = [
+        update_keywords(rows[0], categories("b", "c"), writer, console),
+        update_keywords(rows[1], categories("a"), writer, console),
+        update_keywords(rows[2], categories("c", "d"), writer, console),
+    ]
+
+    assert changed == [True, False, True]
+    plan = writer.plan()
+    assert plan.links_to_add == {"c": ["row-1"], "d": ["row-3"]}
+    assert plan.links_to_remove == {"a": ["row-1", "row-3"]}
+    # batched per category across the plugins: one call each
+    assert plan.api_calls["add_links"] == 1
+    assert plan.api_calls["remove_links"] == 1
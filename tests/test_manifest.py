@@ -0,0 +1,24 @@
+import get_plugins
+import pytest
+from interface import ManifestFields, PluginItems
+
+
+def test_unchanged_manifest_is_not_parsed_again(
+    github: object, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    fixtures = github.fixtures  # type: ignore
+    entry = fixtures.registry[1]  # on master, the first branch tried
+    plugin = PluginItems(**entry)
+    expected = ManifestFields(
+        fixtures.manifests[entry["repo"]]["isDesktopOnly"],
+        fixtures.manifests[entry["repo"]]["fundingUrl"] or "",
+    )
+
+    assert get_plugins.manifest(plugin) == expected
+
+    def fail(**kwargs: object) -> None:
+        raise AssertionError("parsed again")
+
+    monkeypatch.setattr(get_plugins, "Manifest", fail)
+    assert get_plugins.manifest(plugin) == expected
+    assert github.requests["manifest"] == 2  # type: ignore
@@ -0,0 +1,82 @@
+import json
+from typing import Any, Iterator
+
+import http_client
+import pytest
+import seatable_api.api_gateway
+import seatable_api.main
+from metrics import endpoint, metrics
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from seatable_api import Base
+
+BASE_UUID = "0b1c2d3e-4f50-6172-8394-a5b6c7d8e9f0"
+SERVER = "https://cloud.seatable.io"
+
+
+class SeaTableAdapter(HTTPAdapter):
+    """Answers the SeaTable auth and query calls without a network."""
+
+    def send(self, request: PreparedRequest, **kwargs: Any) -> Response:  # noqa: ANN401
+        if "app-access-token" in str(request.url):
+            body = {
+                "dtable_server": f"{SERVER}/dtable-server/",
+                "dtable_db": f"{SERVER}/dtable-db/",
+                "access_token": "jwt",
+                "dtable_uuid": BASE_UUID,
+            }
+        else:
+            body = {"success": True, "metadata": [], "results": [{"ID": "a"}]}
+        response = Response()
+        response.status_code = 200
+        response._content = json.dumps(body).encode()
+        response.url = str(request.url)
+        response.request = request
+        return response
+
+
+@pytest.fixture
+def seatable() -> Iterator[None]:
+    original = seatable_api.main.requests
+    http_client.configure()
+    http_client.instrument_seatable()
+    http_client.get_session().mount("https://", SeaTableAdapter())
+    metrics.http.clear()
+    yield
+    seatable_api.main.requests = original
+    seatable_api.api_gateway.requests = original
+    http_client.configure()
+    metrics.http.clear()
+
+
+def test_seatable_calls_are_recorded(seatable: None) -> None:
+    base = Base("token", SERVER)
+    base.auth()
+    rows = base.query("SELECT * FROM `Plugins`", convert=False)
+
+    assert rows == [{"ID": "a"}]
+    http = {
+        (x["method"], x["host"], x["endpoint"]): x for x in metrics.report()["http"]
+    }
+    assert set(http) == {
+        ("GET", "cloud.seatable.io", "/api/v2.1/dtable/app-access-token"),
+        ("POST", "cloud.seatable.io", "/dtable-db/api/v1/query/:uuid"),
+    }
+    query = http["POST", "cloud.seatable.io", "/dtable-db/api/v1/query/:uuid"]
+    assert query["calls"] == 1
+    assert query["bytes"] > 0
+
+
+def test_endpoint() -> None:
+    assert endpoint("https://api.github.com/repos/o/r/commits?per_page=1") == (
+        "api.github.com",
+        "/repos/:owner/:repo/commits",
+    )
+    assert endpoint("https://raw.githubusercontent.com/o/r/main/manifest.json") == (
+        "raw.githubusercontent.com",
+        "/:owner/:repo/:branch/manifest.json",
+    )
+    assert endpoint(f"{SERVER}/api/v2/dtables/{BASE_UUID.replace('-', '')}/rows/") == (
+        "cloud.seatable.io",
+        "/api/v2/dtables/:uuid/rows",
+    )
@@ -0,0 +1,26 @@
+import io
+from pathlib import Path
+
+import profiling
+from rich.console import Console
+
+
+def test_profile_writes_the_stats_and_the_summary(tmp_path: Path) -> None:
+    path = tmp_path / "out.prof"
+    timings = profiling.PluginTimings()
+    profiling.plugin_timings, previous = timings, profiling.plugin_timings
+    try:
+        with profiling.profile(path, Console(file=io.StringIO()), top=3):
+            with timings.plugin("slow", "update"), timings.step("update_keywords"):
+                sum(range(100000))
+            with timings.plugin("fast", "update"):
+                pass
+    finally:
+        profiling.plugin_timings = previous
+
+    assert path.exists()
+    summary = (tmp_path / "out.prof.txt").read_text()
+    assert "update: 2 plugins" in summary
+    slowest = summary.split("slowest 2:\n")[1].splitlines()
+    assert "slow  update_keywords" in slowest[0]
+    assert slowest[1].endswith("fast  -")
@@ -0,0 +1,58 @@
+import pytest
+import rate_limit
+from rate_limit import RateLimiter, RateLimitExhaustedError
+
+NOW = 1_000_000.0
+
+
+@pytest.fixture
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """Freeze the clock and record the sleeps instead."""
+    recorded: list[float] = []
+    monkeypatch.setattr(rate_limit.time, "time", lambda: NOW)
+    monkeypatch.setattr(rate_limit.time, "sleep", recorded.append)
+    return recorded
+
+
+def test_no_pacing_above_the_threshold(sleeps: list[float]) -> None:
+    limiter = RateLimiter(pace_below=500)
+    limiter.seed("core", 4000, 5000, NOW + 3600)
+
+    for _ in range(10):
+        limiter.acquire("core")
+
+    assert sleeps == []
+    assert limiter.bucket("core").remaining == 3990
+
+
+def test_paced_until_the_wait_is_too_long(sleeps: list[float]) -> None:
+    # 100 requests left for 100 seconds: one slot per second
+    limiter = RateLimiter(reserve=10, pace_below=500, max_wait=3.5)
+    limiter.seed("core", 100, 5000, NOW + 100)
+
+    for _ in range(4):
+        limiter.acquire("core")
+    for _ in range(2):
+        with pytest.raises(RateLimitExhaustedError) as error:
+            limiter.acquire("core")
+        assert error.value.reset == pytest.approx(
+            NOW + 1 + 100 / 99 + 100 / 98 + 100 / 97
+        )
+
+    first, second, third = 100 / 100, 100 / 99, 100 / 98
+    assert sleeps == pytest.approx([first, first + second, first + second + third])
+    bucket = limiter.bucket("core")
+    # the rejected calls neither spent a request nor pushed the next slot back
+    assert bucket.remaining == 96
+    assert bucket.next_slot == pytest.approx(NOW + 1 + 100 / 99 + 100 / 98 + 100 / 97)
+
+
+def test_reserve_is_kept(sleeps: list[float]) -> None:
+    limiter = RateLimiter(reserve=50, max_wait=90)
+    limiter.seed("core", 50, 5000, NOW + 600)
+
+    with pytest.raises(RateLimitExhaustedError) as error:
+        limiter.acquire("core")
+
+    assert error.value.reset == NOW + 600
+    assert sleeps == []
@@ -0,0 +1,60 @@
+import io
+import os
+from pathlib import Path
+
+import pytest
+import snapshot
+from get_plugins import SNAPSHOT_TTL, load_snapshot, must_refetch, read_plugin_json
+from interface import PluginItems, Task_Info
+from rich.console import Console
+from rich.progress import Progress
+
+NOW = 1.7e9
+
+
+def test_must_refetch() -> None:
+    entry = PluginItems(id="a", name="A", description="", repo="o/a", author="x")
+    known = entry.model_copy(update={"fetched_at": NOW - 10, "expires_at": NOW + 10})
+
+    assert must_refetch(entry, None, NOW) == "new"
+    assert must_refetch(entry, known, NOW) is None
+    for field in ["name", "description", "author", "repo"]:
+        changed = entry.model_copy(update={field: "other"})
+        assert must_refetch(changed, known, NOW) == "changed"
+    assert must_refetch(entry, known, NOW + 10) == "expired"
+    assert must_refetch(entry, known.model_copy(update={"expires_at": None}), NOW)
+
+
+def test_legacy_entries_expire_over_several_runs(tmp_path: Path) -> None:
+    path = tmp_path / "plugins.jsonl"
+    plugins = [PluginItems(id=str(i), name="", description="") for i in range(200)]
+    snapshot.write_plugins(plugins, path)
+    os.utime(path, (NOW, NOW))
+
+    expiries = [x.expires_at for x in load_snapshot(path).values()]
+
+    assert all(NOW + SNAPSHOT_TTL <= x <= NOW + 2 * SNAPSHOT_TTL for x in expiries)  # type: ignore
+    # not all due the same night
+    assert len({int(x // 86400) for x in expiries}) > 1  # type: ignore
+
+
+def test_only_new_changed_and_expired_plugins_are_fetched(
+    github: object, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    registry = github.fixtures.registry  # type: ignore
+    fresh = {"etag": '"kept"', "fetched_at": 1.0, "expires_at": 1e12}
+    known = [PluginItems(**x, **fresh) for x in registry[1:]]
+    known[0].name = "renamed since"  # registry[1] changed
+    known[1].expires_at = 1.0  # registry[2] expired
+    snapshot.write_plugins(known, snapshot.SNAPSHOT_PATH)  # registry[0] is new
+
+    with Progress(console=Console(file=io.StringIO())) as progress:
+        task_info = Task_Info(progress, progress.add_task("", total=5))
+        plugins, _ = read_plugin_json({}, task_info)
+
+    assert [x.id for x in plugins] == [x["id"] for x in registry]
+    assert [x.etag == '"kept"' for x in plugins] == [False, False, False, True, True]
+    assert plugins[1].name == registry[1]["name"]
+    assert github.requests["commits"] == 3  # type: ignore
+    assert snapshot.read_plugins(snapshot.SNAPSHOT_PATH) == plugins
@@ -0,0 +1,76 @@
+import argparse
+from pathlib import Path
+
+import pytest
+import snapshot
+from interface import PluginItems, Shard
+from shard import (
+    IncompleteShardsError,
+    merge_snapshots,
+    parse_shard,
+    select,
+    snapshot_path,
+)
+
+PLUGINS = [
+    PluginItems(id=f"plugin-{i}", name=f"P{i}", description="") for i in range(50)
+]
+
+
+def test_parse_shard() -> None:
+    assert parse_shard("2/3") == Shard(2, 3)
+    for text in ["0/3", "4/3", "3", "a/b"]:
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_shard(text)
+
+
+def test_shards_partition_the_plugins() -> None:
+    shards = [select(PLUGINS, Shard(i, 3)) for i in range(1, 4)]
+    ids = [x.id for shard in shards for x in shard]
+    assert sorted(ids) == sorted(x.id for x in PLUGINS)
+    assert len(ids) == len(set(ids))
+    assert all(shards)
+    assert select(PLUGINS, None) == PLUGINS
+
+
+def write_shards(count: int, skip: int = 0) -> list[Path]:
+    paths = []
+    for i in range(1, count + 1):
+        path = snapshot_path(Shard(i, count))
+        snapshot.write_plugins(select(PLUGINS, Shard(i, count)), path)
+        if i != skip:
+            paths.append(path)
+    return paths
+
+
+def test_merge_keeps_the_community_order(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    community = [*PLUGINS, PluginItems(id="unfetched", name="U", description="")]
+
+    merged, missing = merge_snapshots(write_shards(3), community)
+
+    assert merged == PLUGINS
+    assert [x.id for x in missing] == ["unfetched"]
+    assert snapshot.read_plugins(snapshot.SNAPSHOT_PATH) == PLUGINS
+
+
+@pytest.mark.parametrize(
+    "paths",
+    [
+        lambda: write_shards(3, skip=2),
+        lambda: [*write_shards(3), Path("plugins.3-of-3.jsonl")],
+        lambda: [*write_shards(3, skip=3), *write_shards(2)[1:]],
+        lambda: [*write_shards(3, skip=3), Path("plugins.3-of-3.jsonl.bak")],
+        lambda: [*write_shards(2, skip=2), Path("plugins.2-of-3.jsonl")],
+    ],
+    ids=["missing", "duplicated", "mixed", "renamed", "absent"],
+)
+def test_incomplete_shards_are_not_merged(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, paths
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(IncompleteShardsError):
+        merge_snapshots(paths(), PLUGINS)
+    assert not snapshot.SNAPSHOT_PATH.exists()
@@ -0,0 +1,63 @@
+import json
+from pathlib import Path
+
+import snapshot
+from interface import PluginItems
+
+# plugins.json as written by the old save_plugin: an indented array whose
+# etags lost their quotes to a regex
+LEGACY = """[
+    {
+        "id": "a",
+        "name": "A",
+        "description": "Plugin A",
+        "repo": "o/a",
+        "author": "o",
+        "fundingUrl": "",
+        "isDesktopOnly": false,
+        "last_commit_date": "2023-05-01",
+        "etag": "abc123",
+        "status": null
+    },
+    {
+        "id": "b",
+        "name": "B",
+        "description": "Plugin \\"B\\"",
+        "repo": "o/b",
+        "author": null,
+        "fundingUrl": null,
+        "isDesktopOnly": null,
+        "last_commit_date": null,
+        "etag": null,
+        "status": null
+    }
+]"""
+
+
+def test_legacy_snapshot(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    snapshot.LEGACY_PATH.write_text(LEGACY, encoding="utf-8")
+
+    assert snapshot.snapshot_path() == snapshot.LEGACY_PATH
+    plugins = snapshot.read_plugins(snapshot.snapshot_path())
+
+    assert [x.id for x in plugins] == ["a", "b"]
+    assert plugins[0].etag == '"abc123"'
+    assert plugins[0].last_commit_date == "2023-05-01"
+    assert plugins[1].etag is None
+    assert plugins[1].description == 'Plugin "B"'
+
+
+def test_etags_keep_their_quotes(tmp_path: Path) -> None:
+    path = tmp_path / "plugins.jsonl"
+    plugins = [
+        PluginItems(id="a", name="A", description="", etag='"abc123"'),
+        PluginItems(id="b", name="B", description="\n", etag='W/"def"'),
+    ]
+
+    snapshot.write_plugins(plugins, path)
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(x)["etag"] for x in lines] == ['"abc123"', 'W/"def"']
+    assert snapshot.read_plugins(path) == plugins
+    assert not path.with_suffix(".jsonl.tmp").exists()
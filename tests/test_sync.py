@@ -0,0 +1,73 @@
+import io
+import re
+from pathlib import Path
+from typing import Any
+
+import main
+import pytest
+from database.batch import WriteBuffer
+from database.sync import KEYWORDS_TABLE, PLUGINS_TABLE
+from rich.console import Console
+
+
+class FakeBase:
+    """Serves the SQL queries of sync_table from in-memory tables."""
+
+    def __init__(self) -> None:
+        self.tables: dict[str, list[dict[str, Any]]] = {
+            PLUGINS_TABLE: [self.row("row-1", "a", "2024-01-01")],
+            KEYWORDS_TABLE: [],
+        }
+        self.queries = 0
+
+    @staticmethod
+    def row(row_id: str, plugin_id: str, mtime: str) -> dict[str, Any]:
+        return {"_id": row_id, "_mtime": mtime, "ID": plugin_id, "Name": plugin_id}
+
+    def auth(self) -> None:
+        pass
+
+    def query(self, sql: str) -> list[dict[str, Any]]:
+        self.queries += 1
+        table = re.search(r"FROM `([^`]+)`", sql).group(1)  # type: ignore
+        rows = self.tables[table]
+        if since := re.search(r"`_mtime` >= '([^']+)'", sql):
+            rows = [x for x in rows if x["_mtime"] >= since.group(1)]
+        limit, offset = map(int, re.search(r"LIMIT (\d+) OFFSET (\d+)", sql).groups())  # type: ignore
+        return rows[offset : offset + limit]
+
+    def get_column_link_id(self, table: str, column: str) -> str:
+        return "link"
+
+    def batch_append_rows(self, table: str, rows: list[Any]) -> dict[str, Any]:
+        new = [self.row(f"row-{row['ID']}", row["ID"], "2024-02-01") for row in rows]
+        self.tables[table] += new
+        return {"row_ids": [{"_id": x["_id"]} for x in new]}
+
+    def batch_add_links(self, *args: Any) -> None:  # noqa: ANN401
+        pass
+
+    batch_remove_links = batch_add_links
+
+
+def test_offline_run_syncs_after_changes_were_sent(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    base = FakeBase()
+    monkeypatch.setattr(main, "connect", lambda *args, **kwargs: base)
+
+    db, _ = main.get_database(sync=True)
+    assert db["ID"].tolist() == ["a"]
+
+    writer = WriteBuffer(base, "link")  # type: ignore
+    writer.append_row({"ID": "b"}, [])
+    main.send_changes(Console(file=io.StringIO()), writer)
+
+    # the next offline run sees the row it would otherwise insert again
+    db, _ = main.get_database(offline=True)
+    assert db["ID"].tolist() == ["a", "b"]
+    queries = base.queries
+    db, _ = main.get_database(offline=True)
+    assert base.queries == queries
+    assert db["ID"].tolist() == ["a", "b"]